@@ -67,6 +67,13 @@ class CustomAdminSite(AdminSite):
                     return false;
                 }
                 
+                // 同一令牌60秒内已验证成功过则不再请求服务器（admin页面本身已由认证中间件在服务端校验）
+                const verified = JSON.parse(localStorage.getItem('access_token_verified') || 'null');
+                if (verified && verified.token === access_token && Date.now() - verified.at < 60000) {
+                    console.log('[Admin Page] 令牌近期已验证，跳过验证请求');
+                    return true;
+                }
+                
                 try {
                     console.log('[Admin Page] 验证令牌有效性');
                     const response = await fetch('/api/auth/verify', {
@@ -82,12 +89,14 @@ class CustomAdminSite(AdminSite):
                     
                     if (data.code === 200 && data.data.valid) {
                         console.log('[Admin Page] 令牌验证成功');
+                        localStorage.setItem('access_token_verified', JSON.stringify({token: access_token, at: Date.now()}));
                         return true;
                     } else {
                         console.log('[Admin Page] 令牌验证失败，清理本地存储');
                         localStorage.removeItem('access_token');
                         localStorage.removeItem('refresh_token');
                         localStorage.removeItem('user');
+                        localStorage.removeItem('access_token_verified');
                         return false;
                     }
                 } catch (error) {
@@ -2,14 +2,17 @@
 批量导入API端点
 提供通用的批量导入功能
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Depends
 from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any, List
 import logging
 import openpyxl
 import io
 
-from ..utils.batch_import import BatchImportConfig, BatchImporter
+from ..core.db import get_async_db
+from ..utils.batch_import import BatchImportConfig, BatchImporter, ExcelParser
 
 logger = logging.getLogger(__name__)
 
@@ -226,7 +229,8 @@ async def download_import_template(model_name: str):
 @router.post("/import/{model_name}")
 async def batch_import(
     model_name: str,
-    file: UploadFile = File(..., description="Excel文件")
+    file: UploadFile = File(..., description="Excel文件"),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     批量导入数据
@@ -234,6 +238,7 @@ async def batch_import(
     Args:
         model_name: 模型名称
         file: Excel文件
+        db: 数据库会话（人员导入使用）
         
     Returns:
         导入结果
@@ -263,7 +268,7 @@ async def batch_import(
         elif model_name == "product":
             return await _import_products(contents, file_extension)
         elif model_name == "person":
-            return await _import_persons(contents, file_extension)
+            return await _import_persons(contents, file_extension, db)
         else:
             raise HTTPException(status_code=404, detail=f"不支持的模型: {model_name}")
             
@@ -279,7 +284,8 @@ async def batch_import(
 @router.post("/import/{model_name}/form")
 async def batch_import_form(
     model_name: str,
-    request: Request
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     批量导入数据 - 支持amis表单上传
@@ -287,6 +293,7 @@ async def batch_import_form(
     Args:
         model_name: 模型名称
         request: 请求对象
+        db: 数据库会话（人员导入使用）
         
     Returns:
         导入结果
@@ -327,7 +334,7 @@ async def batch_import_form(
         elif model_name == "product":
             return await _import_products(contents, file_extension)
         elif model_name == "person":
-            return await _import_persons(contents, file_extension)
+            return await _import_persons(contents, file_extension, db)
         else:
             raise HTTPException(status_code=404, detail=f"不支持的模型: {model_name}")
             
@@ -526,16 +533,20 @@ async def _import_products(file_content: bytes, file_extension: str) -> Dict[str
     }
 
 
-async def _import_persons(file_content: bytes, file_extension: str) -> Dict[str, Any]:
-    """导入人员数据"""
-    from app.organization.models.person import Person
-    from app.core.config import settings
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-    from datetime import datetime, date
+async def _import_persons(file_content: bytes, file_extension: str, db: AsyncSession) -> Dict[str, Any]:
+    """
+    导入人员数据
+    
+    按模板列顺序解析Excel后交给PersonImportService，在同一个事务中批量写入，
+    不再为每一行创建数据库引擎和同步会话。
+    """
+    from pydantic import ValidationError
+    from app.organization.schemas.person_import import PersonImportItem
+    from app.organization.services.person_import_service import PersonImportService
     
     config = BatchImportConfig(
         model_name="person",
+        max_rows=1000,
         fields=[
             {"name": "name", "type": "string", "required": True, "description": "人员姓名，必填"},
             {"name": "code", "type": "string", "required": True, "description": "人员编码，必填且唯一"},
@@ -564,75 +575,54 @@ async def _import_persons(file_content: bytes, file_extension: str) -> Dict[str,
         ]
     )
     
-    importer = BatchImporter(config)
+    # 解析Excel（openpyxl/xlrd为同步调用，在线程池中执行，不阻塞事件循环）
+    data_list, errors = await run_in_threadpool(ExcelParser.parse_file, file_content, file_extension, config)
     
-    def create_person(data: Dict[str, Any]) -> Person:
-        sync_engine = create_engine(settings.DATABASE_URL)
-        SyncSession = sessionmaker(bind=sync_engine)
-        
-        date_fields = ['birth_date', 'hire_date', 'probation_end_date', 'contract_start_date', 'contract_end_date']
-        for field in date_fields:
-            if field in data and data[field]:
-                try:
-                    data[field] = datetime.strptime(data[field], '%Y-%m-%d').date()
-                except:
-                    data[field] = None
-        
-        if 'employment_status' not in data or not data['employment_status']:
-            data['employment_status'] = 'active'
+    gender_map = {
+        '男': 'male',
+        '女': 'female',
+        '其他': 'other',
+        'male': 'male',
+        'female': 'female',
+        'other': 'other'
+    }
+    import_data = []
+    failed_count = len(errors)
+    for data in data_list:
+        # 日期单元格解析为"YYYY-MM-DD HH:MM:SS"，只保留日期部分
+        for field in ['birth_date', 'hire_date', 'probation_end_date', 'contract_start_date', 'contract_end_date']:
+            if data.get(field):
+                data[field] = data[field].split(' ')[0]
         
-        if 'gender' in data and data['gender']:
-            gender_map = {
-                '男': 'male',
-                '女': 'female',
-                '其他': 'other',
-                'male': 'male',
-                'female': 'female',
-                'other': 'other'
-            }
+        if data.get('gender'):
             data['gender'] = gender_map.get(data['gender'], 'other')
         
-        if 'phone' in data and data['phone']:
-            phone_str = str(data['phone']).strip()
-            if len(phone_str) == 11 and phone_str.isdigit():
-                data['phone'] = phone_str
-            else:
-                data['phone'] = None
+        # 格式不正确的手机号和身份证号置空，不影响其他字段导入
+        if data.get('phone') and not (len(data['phone']) == 11 and data['phone'].isdigit()):
+            data['phone'] = None
+        if data.get('id_card') and len(data['id_card']) not in [15, 18]:
+            data['id_card'] = None
         
-        if 'id_card' in data and data['id_card']:
-            id_card_str = str(data['id_card']).strip()
-            if len(id_card_str) in [15, 18]:
-                data['id_card'] = id_card_str
-            else:
-                data['id_card'] = None
-        
-        if 'organization_id' in data and data['organization_id']:
-            from sqlalchemy import text
-            with SyncSession() as session:
-                result = session.execute(text("SELECT id FROM organizations WHERE id = :org_id"), 
-                                       {"org_id": data['organization_id']})
-                if not result.fetchone():
-                    data['organization_id'] = None
-        
-        with SyncSession() as session:
-            existing_person = session.execute(
-                text("SELECT id FROM persons WHERE code = :code"),
-                {"code": data['code']}
-            ).fetchone()
-            
-            if existing_person:
-                raise Exception(f"人员编码 {data['code']} 已存在")
-            
-            person = Person(**data)
-            session.add(person)
-            session.commit()
-            session.refresh(person)
-            return person
+        try:
+            import_data.append(PersonImportItem(**data))
+        except ValidationError as e:
+            failed_count += 1
+            messages = '; '.join(f"{error['loc'][0]}: {error['msg']}" for error in e.errors())
+            errors.append(f"人员编码 {data.get('code')}：{messages}")
+    
+    service = PersonImportService(db)
+    result = await service.import_persons(data=import_data, import_mode="append", skip_duplicates=True)
     
-    result = importer.import_from_file(file_content, file_extension, create_person)
+    failed_count += result.failed_count
+    errors.extend(f"人员编码 {error['data'].get('code')}：{error['error_message']}" for error in result.errors)
     
     return {
         "status": 0,
-        "msg": f"批量导入完成，成功{result.success_count}条，失败{result.failed_count}条",
-        "data": result.to_dict()
+        "msg": f"批量导入完成，成功{result.success_count}条，失败{failed_count}条，跳过{result.skipped_count}条",
+        "data": {
+            "success_count": result.success_count,
+            "failed_count": failed_count,
+            "skipped_count": result.skipped_count,
+            "errors": errors
+        }
     }
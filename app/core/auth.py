@@ -1,6 +1,11 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
-from jose import JWTError, jwt
+from typing import Optional, Dict, Any, Tuple
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import OAuth2PasswordBearer
@@ -19,12 +24,47 @@ pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
 
+# JWT签名/验证使用的密钥对象和参数，启动时构建一次，避免每次编解码都重新构造密钥
+JWT_KEY = jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+JWT_ALGORITHMS = [settings.ALGORITHM]
+JWT_DECODE_OPTIONS = {"verify_exp": True}
+
+# 令牌解码缓存：键为令牌的SHA-256摘要前16字节（不保存原始令牌），值为(载荷, 缓存到期时间)
+TOKEN_CACHE_MAXSIZE = 10000
+TOKEN_CACHE_TTL = 30  # 秒
+_token_cache: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+# 登录凭据校验结果缓存：键为以SECRET_KEY为密钥的 用户名+密码 的BLAKE2b摘要（不保存明文密码），
+# 值为(用户名, 校验时数据库中的密码哈希或None, 是否校验通过, 缓存到期时间)。
+# 只缓存密码哈希的计算结果，用户信息每次仍从数据库读取：数据库中的密码哈希与缓存时不同（已修改密码）则缓存作废，
+# 用户被停用等修改立即生效，多进程部署时也不依赖各进程自行清除缓存；重复的错误凭据会被延迟后直接拒绝
+AUTH_CACHE_MAXSIZE = 10000
+AUTH_CACHE_TTL = 60  # 秒
+AUTH_FAILURE_DELAY = 0.1  # 命中失败缓存时的延迟（秒）
+_auth_cache_key = hashlib.sha256(settings.SECRET_KEY.encode("utf-8")).digest()
+_auth_cache: "OrderedDict[bytes, Tuple[str, Optional[str], bool, float]]" = OrderedDict()
+_auth_cache_lock = threading.Lock()
+
+# 角色标记位：认证中间件将用户的职员/超级管理员标记合并为一个整数，保存在request.state.role_mask
+ROLE_STAFF = 0b01
+ROLE_SUPERUSER = 0b10
+
+
 class TokenData(BaseModel):
     """JWT 载荷数据模型"""
     sub: Optional[str] = None  # 用户 ID（字符串形式）
     token_type: Optional[str] = None
 
 
+def get_role_mask(user: Optional[Dict[str, Any]]) -> int:
+    """根据用户信息计算角色标记位，未登录为0"""
+    if not user:
+        return 0
+    return (ROLE_SUPERUSER if user.get("is_superuser") else 0) | (ROLE_STAFF if user.get("is_staff") else 0)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码（使用 Django 的 check_password 函数）"""
     try:
@@ -68,7 +108,7 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     to_encode.update({"exp": expire, "token_type": "access"})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return jwt.encode(to_encode, JWT_KEY, algorithm=settings.ALGORITHM)
 
 
 def create_refresh_token(data: Dict[str, Any]) -> str:
@@ -76,7 +116,55 @@ def create_refresh_token(data: Dict[str, Any]) -> str:
     expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode = data.copy()
     to_encode.update({"exp": expire, "token_type": "refresh"})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return jwt.encode(to_encode, JWT_KEY, algorithm=settings.ALGORITHM)
+
+
+def decode_token_cached(token: str) -> Dict[str, Any]:
+    """
+    解码并验证JWT令牌，结果短时缓存（LRU + TTL）
+
+    同一令牌在缓存有效期内不再重复做签名验证；缓存到期时间取令牌exp与TTL中较早者，
+    因此不会返回已过期令牌的载荷。验证失败时抛出JWTError且不缓存。
+    返回的载荷为缓存共享对象，调用方不要修改。
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()[:16]
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+        if cached is not None:
+            payload, expires_at = cached
+            if expires_at > now:
+                _token_cache.move_to_end(key)
+                return payload
+            del _token_cache[key]
+
+    payload = jwt.decode(token, JWT_KEY, algorithms=JWT_ALGORITHMS, options=JWT_DECODE_OPTIONS)
+    expires_at = now + TOKEN_CACHE_TTL
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, exp)
+
+    with _token_cache_lock:
+        _token_cache[key] = (payload, expires_at)
+        _token_cache.move_to_end(key)
+        if len(_token_cache) > TOKEN_CACHE_MAXSIZE:
+            _token_cache.popitem(last=False)
+    return payload
+
+
+def purge_expired_auth_caches() -> int:
+    """清理令牌解码缓存和登录认证缓存中已过期的条目，返回清理的条目数（由后台任务定期调用）"""
+    now = time.time()
+    removed = 0
+    with _token_cache_lock:
+        for key in [key for key, (_, expires_at) in _token_cache.items() if expires_at <= now]:
+            del _token_cache[key]
+            removed += 1
+    with _auth_cache_lock:
+        for key in [key for key, (_, _, _, expires_at) in _auth_cache.items() if expires_at <= now]:
+            del _auth_cache[key]
+            removed += 1
+    return removed
 
 
 async def get_user_from_db(db: AsyncSession, username: str) -> Optional[Dict[str, Any]]:
@@ -144,13 +232,42 @@ async def get_user_by_id_from_db(db: AsyncSession, user_id: int) -> Optional[Dic
 
 
 async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[Dict[str, Any]]:
-    """认证用户凭据"""
+    """认证用户凭据（密码校验结果短时缓存，缓存期内数据库中密码哈希未变时不再重复校验密码哈希）"""
+    key = hashlib.blake2b(
+        f"{username}\0{password}".encode("utf-8"), key=_auth_cache_key, digest_size=16
+    ).digest()
+    now = time.time()
+    with _auth_cache_lock:
+        cached = _auth_cache.get(key)
+        if cached is not None and cached[3] <= now:
+            del _auth_cache[key]
+            cached = None
+
+    # 用户信息总是读取数据库中的最新状态
     user = await get_user_from_db(db, username)
-    if not user:
-        return None
-    if not verify_password(password, user["password"]):
-        return None
-    return user
+    password_hash = user["password"] if user else None
+    if cached is not None and cached[1] == password_hash:
+        if not cached[2]:
+            # 重复提交的错误凭据：延迟后直接拒绝，减缓暴力破解
+            await asyncio.sleep(AUTH_FAILURE_DELAY)
+            return None
+        return user
+
+    verified = bool(user) and verify_password(password, password_hash)
+
+    with _auth_cache_lock:
+        _auth_cache[key] = (username, password_hash, verified, now + AUTH_CACHE_TTL)
+        _auth_cache.move_to_end(key)
+        if len(_auth_cache) > AUTH_CACHE_MAXSIZE:
+            _auth_cache.popitem(last=False)
+    return user if verified else None
+
+
+def invalidate_auth_cache(username: str) -> None:
+    """清除某个用户的认证结果缓存（登出、修改密码时调用）"""
+    with _auth_cache_lock:
+        for key in [key for key, (cached_username, _, _, _) in _auth_cache.items() if cached_username == username]:
+            del _auth_cache[key]
 
 
 async def get_current_user(
@@ -164,7 +281,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(token, JWT_KEY, algorithms=JWT_ALGORITHMS)
         user_id_str: Optional[str] = payload.get("sub")
         token_type: Optional[str] = payload.get("token_type")
 
@@ -285,16 +402,19 @@ async def record_logout_history(
         return False
 
 
-async def get_client_info(request: Request) -> tuple:
-    """获取客户端IP和User-Agent信息"""
-    ip_address = None
-    
+def get_client_ip(request: Request) -> Optional[str]:
+    """获取客户端IP（优先使用代理转发的X-Forwarded-For中的第一个地址）"""
     x_forwarded_for = request.headers.get("X-Forwarded-For")
     if x_forwarded_for:
-        ip_address = x_forwarded_for.split(",")[0].strip()
-    else:
-        ip_address = request.client.host if request.client else None
-    
+        ip_address = x_forwarded_for.split(",", 1)[0].strip()
+        if ip_address:
+            return ip_address
+    return request.client.host if request.client else None
+
+
+async def get_client_info(request: Request) -> tuple:
+    """获取客户端IP和User-Agent信息"""
+    ip_address = get_client_ip(request)
     user_agent = request.headers.get("User-Agent", "")
     
     return ip_address, user_agent
@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     
     # 运行模式
     DEBUG: bool = True
+    WORKERS: Optional[int] = None  # 生产环境工作进程数，未设置时使用CPU核数
     
     # 安全配置
     SECRET_KEY: str = "your-secret-key-here"
@@ -29,6 +30,9 @@ class Settings(BaseSettings):
     DATABASE_POOL_SIZE: int = 10
     DATABASE_MAX_OVERFLOW: int = 20
     DATABASE_POOL_TIMEOUT: int = 30
+    DATABASE_POOL_RECYCLE: int = 1800  # 连接回收时间（秒）
+    DATABASE_STATEMENT_CACHE_SIZE: int = 1024  # asyncpg 预编译语句缓存大小
+    DATABASE_HEALTH_CHECK_INTERVAL: int = 5  # 后台数据库健康检查间隔（秒）
     
     # Redis配置
     REDIS_URL: Optional[str] = None
@@ -36,6 +40,7 @@ class Settings(BaseSettings):
     # Amis配置
     AMIS_CDN: str = "https://unpkg.com"
     AMIS_PKG: str = "amis@6.3.0"
+    AMIS_STATIC_DIR: str = "E:/HSdigitalportal/fastapi_amis_admin/static/amis"  # 本地Amis静态文件目录
     
     # 管理员配置
     ADMIN_PATH: str = "/admin"
@@ -53,6 +58,7 @@ class Settings(BaseSettings):
     CORS_ALLOW_CREDENTIALS: bool = True
     CORS_ALLOW_METHODS: list = ["*"]
     CORS_ALLOW_HEADERS: list = ["*"]
+    CORS_MAX_AGE: int = 600  # 浏览器缓存预检（OPTIONS）结果的秒数
     CORS_ORIGINS: list = [
         "http://localhost:3000",
         "http://127.0.0.1:3000",
@@ -2,7 +2,7 @@ from sqlmodel import SQLModel
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
 from .config import settings
 from .db_pool import db_manager
 from .logging import logger
@@ -164,6 +164,16 @@ async def get_async_db():
 # 别名函数，符合更简洁的命名习惯
 get_db = get_async_db
 
+async def get_request_db(request: Request) -> AsyncSession:
+    """获取当前请求共用的数据库会话（首次调用时创建并保存在request.state.db，请求结束时由DBSessionMiddleware关闭）"""
+    session = getattr(request.state, "db", None)
+    if session is None:
+        if async_session_factory is None:
+            raise RuntimeError("数据库尚未初始化。请确保应用已经启动并完成了数据库初始化。")
+        session = async_session_factory()
+        request.state.db = session
+    return session
+
 def get_async_db_session():
     """获取异步数据库会话上下文管理器"""
     return async_session_factory
@@ -28,6 +28,14 @@ class DatabaseConnectionManager:
         try:
             logger.info("正在初始化数据库连接池...")
             
+            # asyncpg 驱动下保持预编译语句缓存，重复执行的语句无需再次解析
+            connect_args = {}
+            if self.database_url.startswith("postgresql+asyncpg"):
+                connect_args = {
+                    "statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+                    "prepared_statement_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+                }
+            
             self.engine = create_async_engine(
                 self.database_url,
                 echo=settings.DEBUG,
@@ -36,8 +44,9 @@ class DatabaseConnectionManager:
                 max_overflow=settings.DATABASE_MAX_OVERFLOW,
                 pool_timeout=settings.DATABASE_POOL_TIMEOUT,
                 pool_pre_ping=True,
-                pool_recycle=3600,
+                pool_recycle=settings.DATABASE_POOL_RECYCLE,
                 pool_use_lifo=True,
+                connect_args=connect_args,
             )
             
             logger.info(f"数据库连接池初始化成功 - 连接池大小: {settings.DATABASE_POOL_SIZE}, 最大溢出: {settings.DATABASE_MAX_OVERFLOW}")
@@ -59,8 +68,7 @@ class DatabaseConnectionManager:
             engine = await self.get_engine()
             
             async with engine.connect() as conn:
-                result = await conn.execute(text("SELECT 1"))
-                result.fetchone()
+                await conn.scalar(text("SELECT 1"))
             
             async with self._lock:
                 self._connection_stats["last_health_check"] = datetime.now()
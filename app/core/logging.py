@@ -1,4 +1,7 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from app.core.config import settings
 
@@ -6,16 +9,30 @@ from app.core.config import settings
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s"
 LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# 实际输出日志的处理器
+_log_formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+_log_handlers = [
+    logging.StreamHandler(sys.stdout),  # 控制台输出
+    logging.FileHandler("app.log", encoding="utf-8")  # 文件输出
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+# 请求处理中只把日志记录放入队列，写控制台和文件由后台线程完成，不阻塞事件循环
+_log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+log_listener.start()
+# 进程退出时写完队列中剩余的日志
+atexit.register(log_listener.stop)
+# 入队时只合并消息和异常堆栈，完整格式由输出处理器添加
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
 # 配置根日志
 logging.basicConfig(
     level=logging.INFO if settings.DEBUG else logging.WARNING,
-    format=LOG_FORMAT,
-    datefmt=LOG_DATE_FORMAT,
-    handlers=[
-        logging.StreamHandler(sys.stdout),  # 控制台输出
-        logging.FileHandler("app.log", encoding="utf-8")  # 文件输出
-    ]
+    handlers=[_queue_handler]
 )
 
 # 全局日志实例
-logger = logging.getLogger("enterprise-portal")
\ No newline at end of file
+logger = logging.getLogger("enterprise-portal")
@@ -13,7 +13,7 @@ from sqlalchemy.exc import SQLAlchemyError
 # 核心配置/工具导入（规范绝对导入，补充类型提示）
 from app.core.config import settings
 from app.core.db import get_async_db_session
-from app.core.auth import get_user_from_db, get_user_by_id_from_db
+from app.core.auth import get_user_from_db, get_user_by_id_from_db, get_role_mask, JWT_KEY, JWT_ALGORITHMS, JWT_DECODE_OPTIONS
 from app.core.logging import logger
 
 class AuthenticationMiddleware(BaseHTTPMiddleware):
@@ -46,6 +46,7 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
         request.state.user: Optional[Dict[str, Any]] = None
         request.state.token: Optional[str] = None
         request.state.is_authenticated: bool = False
+        request.state.role_mask: int = 0
         
         # 获取请求基础信息（便于日志追踪）
         client_ip = request.client.host if request.client else "unknown"
@@ -81,6 +82,7 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
                 if user:
                     request.state.user = user
                     request.state.is_authenticated = True
+                    request.state.role_mask = get_role_mask(user)
                     logger.info(
                         f"[AuthMiddleware-{request_id}] User authenticated "
                         f"(IP: {client_ip}, User: {user.get('username')}, Path: {request_path})"
@@ -154,9 +156,9 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
             # 1. 解码JWT Token
             payload = jwt.decode(
                 token,
-                settings.SECRET_KEY,
-                algorithms=[settings.ALGORITHM],
-                options={"verify_exp": True}  # 强制验证过期时间
+                JWT_KEY,
+                algorithms=JWT_ALGORITHMS,
+                options=JWT_DECODE_OPTIONS  # 强制验证过期时间
             )
 
             # 2. 提取用户标识
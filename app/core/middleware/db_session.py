@@ -0,0 +1,24 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class DBSessionMiddleware:
+    """
+    请求级数据库会话中间件
+
+    同一请求内的各个处理钩子通过get_request_db共用一个会话（按需创建，保存在request.state.db），
+    请求结束后在这里统一关闭，未提交的事务随关闭回滚。
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session = scope.get("state", {}).get("db")
+            if session is not None:
+                await session.close()
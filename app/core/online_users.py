@@ -1,3 +1,4 @@
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Set, Optional
 from fastapi import Request
@@ -15,7 +16,7 @@ class OnlineUserManager:
         # 存储在线用户信息: {user_id: {'last_activity': datetime, 'ip_address': str, 'user_agent': str}}
         self.online_users: Dict[int, dict] = {}
     
-    def add_online_user(
+    async def add_online_user(
         self,
         user_id: int,
         ip_address: Optional[str] = None,
@@ -35,7 +36,7 @@ class OnlineUserManager:
         }
         logger.info(f"用户上线: user_id={user_id}, ip={ip_address}")
     
-    def update_user_activity(
+    async def update_user_activity(
         self,
         user_id: int,
         ip_address: Optional[str] = None,
@@ -48,24 +49,24 @@ class OnlineUserManager:
         ip_address: IP地址
         user_agent: User-Agent信息
         """
-        if user_id in self.online_users:
-            self.online_users[user_id]['last_activity'] = datetime.utcnow()
+        data = self.online_users.get(user_id)
+        if data is not None:
+            data['last_activity'] = datetime.utcnow()
             if ip_address:
-                self.online_users[user_id]['ip_address'] = ip_address
+                data['ip_address'] = ip_address
             if user_agent:
-                self.online_users[user_id]['user_agent'] = user_agent
+                data['user_agent'] = user_agent
     
-    def remove_online_user(self, user_id: int):
+    async def remove_online_user(self, user_id: int):
         """
         移除在线用户
         
         user_id: 用户ID
         """
-        if user_id in self.online_users:
-            del self.online_users[user_id]
+        if self.online_users.pop(user_id, None) is not None:
             logger.info(f"用户下线: user_id={user_id}")
     
-    def is_user_online(self, user_id: int) -> bool:
+    async def is_user_online(self, user_id: int) -> bool:
         """
         检查用户是否在线
         
@@ -73,61 +74,63 @@ class OnlineUserManager:
         
         返回: 是否在线
         """
-        if user_id not in self.online_users:
+        data = self.online_users.get(user_id)
+        if data is None:
             return False
         
         # 检查是否超时
-        last_activity = self.online_users[user_id]['last_activity']
+        last_activity = data['last_activity']
         timeout = timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
         
         if datetime.utcnow() - last_activity > timeout:
             # 超时，移除用户
-            self.remove_online_user(user_id)
+            await self.remove_online_user(user_id)
             return False
         
         return True
     
-    def get_online_user_count(self) -> int:
+    async def get_online_user_count(self) -> int:
         """
         获取在线用户数量
         
         返回: 在线用户数
         """
-        self.clean_inactive_users()
+        await self.clean_inactive_users()
         return len(self.online_users)
     
-    def get_online_users(self) -> Dict[int, dict]:
+    async def get_online_users(self) -> Dict[int, dict]:
         """
         获取所有在线用户
         
         返回: 在线用户字典
         """
-        self.clean_inactive_users()
+        await self.clean_inactive_users()
         return self.online_users.copy()
     
-    def get_online_user_ids(self) -> Set[int]:
+    async def get_online_user_ids(self) -> Set[int]:
         """
         获取所有在线用户ID
         
         返回: 在线用户ID集合
         """
-        self.clean_inactive_users()
+        await self.clean_inactive_users()
         return set(self.online_users.keys())
     
-    def clean_inactive_users(self):
+    async def clean_inactive_users(self):
         """清理不活跃的用户"""
         current_time = datetime.utcnow()
         timeout = timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES)
         
+        # 先对字典做快照再遍历，避免并发请求修改字典导致迭代出错
         inactive_users = [
-            user_id for user_id, data in self.online_users.items()
+            user_id for user_id, data in list(self.online_users.items())
             if current_time - data['last_activity'] > timeout
         ]
         
         for user_id in inactive_users:
-            self.remove_online_user(user_id)
+            await self.remove_online_user(user_id)
     
-    def get_user_info(self, user_id: int) -> Optional[dict]:
+    async def get_user_info(self, user_id: int) -> Optional[dict]:
         """
         获取用户在线信息
         
@@ -135,13 +138,177 @@ class OnlineUserManager:
         
         返回: 用户在线信息，如果用户不在线则返回None
         """
-        if self.is_user_online(user_id):
-            return self.online_users[user_id].copy()
+        if await self.is_user_online(user_id):
+            data = self.online_users.get(user_id)
+            return data.copy() if data is not None else None
         return None
 
 
+class RedisOnlineUserManager:
+    """
+    基于Redis的在线用户管理器
+
+    在线用户保存在有序集合 user:online 中（成员为用户ID，分值为最后活动时间戳），
+    客户端信息保存在哈希 user:meta:<user_id> 中，多个worker进程共享同一份在线状态。
+    使用redis.asyncio客户端，各方法均为协程，访问Redis时不阻塞事件循环。
+    """
+    
+    ONLINE_KEY = "user:online"
+    META_KEY_PREFIX = "user:meta:"
+    
+    # 一次往返内清理超时用户并返回在线人数
+    _COUNT_SCRIPT = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    return redis.call('ZCARD', KEYS[1])
+    """
+    
+    def __init__(self, client):
+        self.client = client
+        self._count_script = client.register_script(self._COUNT_SCRIPT)
+    
+    @property
+    def timeout_seconds(self) -> int:
+        return settings.SESSION_TIMEOUT_MINUTES * 60
+    
+    def _meta_key(self, user_id: int) -> str:
+        return f"{self.META_KEY_PREFIX}{user_id}"
+    
+    def _expired_before(self) -> float:
+        return time.time() - self.timeout_seconds
+    
+    @staticmethod
+    def _to_info(score: float, meta: dict) -> dict:
+        return {
+            'last_activity': datetime.utcfromtimestamp(score),
+            'ip_address': meta.get('ip_address') or None,
+            'user_agent': meta.get('user_agent') or None
+        }
+    
+    async def add_online_user(
+        self,
+        user_id: int,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ):
+        """添加在线用户"""
+        meta_key = self._meta_key(user_id)
+        pipe = self.client.pipeline()
+        pipe.zadd(self.ONLINE_KEY, {str(user_id): time.time()})
+        pipe.delete(meta_key)
+        pipe.hset(meta_key, mapping={'ip_address': ip_address or '', 'user_agent': user_agent or ''})
+        pipe.expire(meta_key, self.timeout_seconds)
+        await pipe.execute()
+        logger.info(f"用户上线: user_id={user_id}, ip={ip_address}")
+    
+    async def update_user_activity(
+        self,
+        user_id: int,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ):
+        """更新用户活动时间"""
+        # XX: 只更新已在线的用户
+        if not await self.client.zadd(self.ONLINE_KEY, {str(user_id): time.time()}, xx=True, ch=True):
+            return
+        meta_key = self._meta_key(user_id)
+        mapping = {}
+        if ip_address:
+            mapping['ip_address'] = ip_address
+        if user_agent:
+            mapping['user_agent'] = user_agent
+        pipe = self.client.pipeline()
+        if mapping:
+            pipe.hset(meta_key, mapping=mapping)
+        pipe.expire(meta_key, self.timeout_seconds)
+        await pipe.execute()
+    
+    async def remove_online_user(self, user_id: int):
+        """移除在线用户"""
+        pipe = self.client.pipeline()
+        pipe.zrem(self.ONLINE_KEY, str(user_id))
+        pipe.delete(self._meta_key(user_id))
+        removed, _ = await pipe.execute()
+        if removed:
+            logger.info(f"用户下线: user_id={user_id}")
+    
+    async def is_user_online(self, user_id: int) -> bool:
+        """检查用户是否在线"""
+        score = await self.client.zscore(self.ONLINE_KEY, str(user_id))
+        if score is None:
+            return False
+        if score < self._expired_before():
+            await self.remove_online_user(user_id)
+            return False
+        return True
+    
+    async def get_online_user_count(self) -> int:
+        """获取在线用户数量"""
+        return int(await self._count_script(keys=[self.ONLINE_KEY], args=[self._expired_before()]))
+    
+    async def get_online_users(self) -> Dict[int, dict]:
+        """获取所有在线用户"""
+        await self.clean_inactive_users()
+        members = await self.client.zrange(self.ONLINE_KEY, 0, -1, withscores=True)
+        if not members:
+            return {}
+        pipe = self.client.pipeline()
+        for member, _ in members:
+            pipe.hgetall(self._meta_key(member))
+        metas = await pipe.execute()
+        return {
+            int(member): self._to_info(score, meta)
+            for (member, score), meta in zip(members, metas)
+        }
+    
+    async def get_online_user_ids(self) -> Set[int]:
+        """获取所有在线用户ID"""
+        await self.clean_inactive_users()
+        return {int(member) for member in await self.client.zrange(self.ONLINE_KEY, 0, -1)}
+    
+    async def clean_inactive_users(self):
+        """清理不活跃的用户（用户元数据通过过期时间自动清除）"""
+        await self.client.zremrangebyscore(self.ONLINE_KEY, '-inf', self._expired_before())
+    
+    async def get_user_info(self, user_id: int) -> Optional[dict]:
+        """获取用户在线信息，如果用户不在线则返回None"""
+        score = await self.client.zscore(self.ONLINE_KEY, str(user_id))
+        if score is None or score < self._expired_before():
+            return None
+        return self._to_info(score, await self.client.hgetall(self._meta_key(user_id)))
+
+
+def create_online_user_manager():
+    """
+    创建在线用户管理器
+    
+    配置了REDIS_URL时使用Redis存储，以便多个worker进程共享在线状态；
+    否则使用进程内存储。
+    """
+    if settings.REDIS_URL:
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            logger.warning("已配置REDIS_URL但未安装redis，在线用户状态将使用进程内存储")
+        else:
+            client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+            return RedisOnlineUserManager(client)
+    return OnlineUserManager()
+
+
 # 全局在线用户管理器实例
-online_user_manager = OnlineUserManager()
+online_user_manager = create_online_user_manager()
+
+# 查询在线用户详情时IN子句的单批ID数量
+ONLINE_USER_QUERY_BATCH_SIZE = 1000
+
+# 不记录活动日志的路径前缀（健康检查、静态资源、接口文档等）
+ACTIVITY_LOG_SKIP_PREFIXES = ('/health', '/metrics', '/static', '/docs', '/redoc', '/openapi.json')
+# 只匹配前缀本身或其下级路径，/healthcare、/docs-archive 等其他路由仍记录
+_ACTIVITY_LOG_SKIP_PATHS = frozenset(ACTIVITY_LOG_SKIP_PREFIXES)
+_ACTIVITY_LOG_SKIP_SUBPATHS = tuple(prefix + '/' for prefix in ACTIVITY_LOG_SKIP_PREFIXES)
+
+# 活动日志中记录的查询字符串最大长度
+ACTIVITY_LOG_QUERY_MAX_LENGTH = 200
 
 
 async def get_online_users_with_details(db: AsyncSession) -> list:
@@ -152,21 +319,25 @@ async def get_online_users_with_details(db: AsyncSession) -> list:
     """
     from app.users.models.user import User
     
-    online_user_ids = online_user_manager.get_online_user_ids()
+    # 一次性清理超时用户并获取快照，避免在循环中逐个检查超时和复制字典
+    snapshot = await online_user_manager.get_online_users()
     
-    if not online_user_ids:
+    if not snapshot:
         return []
     
-    # 查询用户详细信息
-    result = await db.execute(
-        select(User).where(User.id.in_(online_user_ids))
-    )
-    users = result.scalars().all()
+    # 分批查询用户详细信息，避免IN子句参数数量过多
+    user_ids = list(snapshot)
+    users = []
+    for i in range(0, len(user_ids), ONLINE_USER_QUERY_BATCH_SIZE):
+        result = await db.execute(
+            select(User).where(User.id.in_(user_ids[i:i + ONLINE_USER_QUERY_BATCH_SIZE]))
+        )
+        users.extend(result.scalars().all())
     
     # 组合在线状态和用户信息
     online_users = []
     for user in users:
-        online_info = online_user_manager.get_user_info(user.id)
+        online_info = snapshot.get(user.id)
         if online_info:
             online_users.append({
                 'id': user.id,
@@ -203,16 +374,29 @@ async def track_user_activity(
     ip_address, user_agent = await get_client_info(request)
     
     # 更新用户在线状态
-    online_user_manager.update_user_activity(user_id, ip_address, user_agent)
+    await online_user_manager.update_user_activity(user_id, ip_address, user_agent)
+    
+    # 直接从scope中一次性取出请求路径、方法和原始查询字符串，避免重复构造URL等对象
+    scope = request.scope
     
     # 记录活动日志（可选）
-    await record_user_activity(db, user_id, request, ip_address, user_agent)
+    await record_user_activity(
+        db,
+        user_id,
+        scope['path'],
+        scope['method'],
+        scope.get('query_string', b''),
+        ip_address,
+        user_agent
+    )
 
 
 async def record_user_activity(
     db: AsyncSession,
     user_id: int,
-    request: Request,
+    path: str,
+    method: str,
+    query_string: bytes,
     ip_address: Optional[str],
     user_agent: Optional[str]
 ):
@@ -220,18 +404,20 @@ async def record_user_activity(
     记录用户活动到数据库
     
     user_id: 用户ID
-    request: FastAPI请求对象
+    path: 请求路径
+    method: 请求方法
+    query_string: 原始查询字符串
     ip_address: IP地址
     user_agent: User-Agent信息
     """
+    # 非业务请求不写入活动日志
+    if path in _ACTIVITY_LOG_SKIP_PATHS or path.startswith(_ACTIVITY_LOG_SKIP_SUBPATHS):
+        return
+    
     try:
         from app.users.models.user import UserActivityLog
         from sqlalchemy import insert
         
-        # 获取请求路径和方法
-        path = request.url.path
-        method = request.method
-        
         # 记录活动日志
         await db.execute(
             insert(UserActivityLog).values(
@@ -243,7 +429,10 @@ async def record_user_activity(
                 meta_data={
                     'method': method,
                     'path': path,
-                    'query_params': str(request.query_params)
+                    'query_params': (
+                        query_string[:ACTIVITY_LOG_QUERY_MAX_LENGTH].decode('latin-1')
+                        if query_string else None
+                    )
                 }
             )
         )
@@ -8,7 +8,7 @@ from sqlalchemy import select, update
 import hashlib
 
 from .config import settings
-from .auth import validate_password_strength
+from .auth import validate_password_strength, invalidate_auth_cache
 from .logging import logger
 
 
@@ -182,6 +182,9 @@ async def reset_password(
     # 使令牌失效
     password_reset_manager.invalidate_token(token)
     
+    # 旧密码的认证缓存失效
+    invalidate_auth_cache(user.username)
+    
     logger.info(f"密码重置成功: user_id={user_id}, username={user.username}")
     
     return {
@@ -229,8 +232,8 @@ async def change_password(
             detail=error_message
         )
     
-    # 检查新旧密码是否相同
-    if verify_password(new_password, user.password):
+    # 检查新旧密码是否相同（旧密码已通过校验，直接比较明文即可，无需再做一次哈希验证）
+    if secrets.compare_digest(old_password.encode("utf-8"), new_password.encode("utf-8")):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="新密码不能与旧密码相同"
@@ -240,6 +243,9 @@ async def change_password(
     user.password = get_password_hash(new_password)
     await db.commit()
     
+    # 旧密码的认证缓存失效
+    invalidate_auth_cache(user.username)
+    
     logger.info(f"密码修改成功: user_id={user_id}, username={user.username}")
     
     return {
@@ -9,7 +9,6 @@ from app.users.models import User, Role, Permission
 
 logger = logging.getLogger(__name__)
 
-
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -54,29 +53,14 @@ class RequirePermission:
     
     async def __call__(
         self,
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        current_user: User = Depends(get_current_active_user)
     ) -> User:
         # 超级用户拥有所有权限
         if current_user.is_superuser:
             return current_user
         
-        # 获取用户的所有角色
-        user_roles = db.exec(
-            select(Role)
-            .where(Role.id.in_([role.id for role in current_user.roles]))
-            .where(Role.is_active == True)
-        ).all()
-        
-        # 获取所有角色的权限
-        permissions = set()
-        for role in user_roles:
-            for permission in role.permissions:
-                if permission.is_active:
-                    permissions.add(permission.code)
-        
         # 检查是否拥有所需权限
-        if self.required_permission not in permissions:
+        if self.required_permission not in current_user.permission_codes:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"需要权限: {self.required_permission}"
@@ -90,32 +74,18 @@ class RequireAnyPermission:
     
     def __init__(self, permissions: List[str]):
         self.permissions = permissions
+        self._required = frozenset(permissions)
     
     async def __call__(
         self,
-        current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        current_user: User = Depends(get_current_active_user)
     ) -> User:
         # 超级用户拥有所有权限
         if current_user.is_superuser:
             return current_user
         
-        # 获取用户的所有角色
-        user_roles = db.exec(
-            select(Role)
-            .where(Role.id.in_([role.id for role in current_user.roles]))
-            .where(Role.is_active == True)
-        ).all()
-        
-        # 获取所有角色的权限
-        user_permissions = set()
-        for role in user_roles:
-            for permission in role.permissions:
-                if permission.is_active:
-                    user_permissions.add(permission.code)
-        
         # 检查是否拥有任意一个所需权限
-        if not any(perm in user_permissions for perm in self.permissions):
+        if self._required.isdisjoint(current_user.permission_codes):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"需要以下权限之一: {', '.join(self.permissions)}"
@@ -140,7 +110,7 @@ class RequireRole:
             return current_user
         
         # 检查用户是否拥有所需角色
-        user_roles = [role.code for role in current_user.roles if role.is_active]
+        user_roles = {role.code for role in current_user.roles if role.is_active}
         
         if self.required_role not in user_roles:
             raise HTTPException(
@@ -156,6 +126,7 @@ class RequireAnyRole:
     
     def __init__(self, roles: List[str]):
         self.roles = roles
+        self._required = frozenset(roles)
     
     async def __call__(
         self,
@@ -167,9 +138,9 @@ class RequireAnyRole:
             return current_user
         
         # 检查用户是否拥有任意一个所需角色
-        user_roles = [role.code for role in current_user.roles if role.is_active]
+        user_roles = {role.code for role in current_user.roles if role.is_active}
         
-        if not any(role in user_roles for role in self.roles):
+        if self._required.isdisjoint(user_roles):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"需要以下角色之一: {', '.join(self.roles)}"
@@ -184,21 +155,7 @@ def has_permission(user: User, permission_code: str, db: Session) -> bool:
     if user.is_superuser:
         return True
     
-    # 获取用户的所有角色
-    user_roles = db.exec(
-        select(Role)
-        .where(Role.id.in_([role.id for role in user.roles]))
-        .where(Role.is_active == True)
-    ).all()
-    
-    # 获取所有角色的权限
-    permissions = set()
-    for role in user_roles:
-        for permission in role.permissions:
-            if permission.is_active:
-                permissions.add(permission.code)
-    
-    return permission_code in permissions
+    return permission_code in user.permission_codes
 
 
 def has_role(user: User, role_code: str) -> bool:
@@ -207,7 +164,7 @@ def has_role(user: User, role_code: str) -> bool:
     if user.is_superuser:
         return True
     
-    user_roles = [role.code for role in user.roles if role.is_active]
+    user_roles = {role.code for role in user.roles if role.is_active}
     return role_code in user_roles
 
 
@@ -215,24 +172,9 @@ def get_user_permissions(user: User, db: Session) -> List[str]:
     """获取用户的所有权限"""
     # 超级用户拥有所有权限
     if user.is_superuser:
-        all_permissions = db.exec(select(Permission).where(Permission.is_active == True)).all()
-        return [perm.code for perm in all_permissions]
-    
-    # 获取用户的所有角色
-    user_roles = db.exec(
-        select(Role)
-        .where(Role.id.in_([role.id for role in user.roles]))
-        .where(Role.is_active == True)
-    ).all()
-    
-    # 获取所有角色的权限
-    permissions = set()
-    for role in user_roles:
-        for permission in role.permissions:
-            if permission.is_active:
-                permissions.add(permission.code)
+        return list(db.exec(select(Permission.codename)).all())
     
-    return list(permissions)
+    return list(user.permission_codes)
 
 
 def get_user_roles(user: User) -> List[str]:
@@ -5,17 +5,18 @@ FastAPI-Amis-Admin 复制功能演示示例
 """
 
 import datetime
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Tuple
 
 import logging
 
-# 配置日志
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 from fastapi import Request
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from sqlmodel import SQLModel, Field, Session, select
+from sqlalchemy import Column, DateTime, func, insert
 from sqlalchemy.exc import IntegrityError
 
 from fastapi_amis_admin import admin
@@ -47,8 +48,14 @@ class Contract(SQLModel, table=True):
     status: str = Field(title="合同状态", default="draft", description="草稿、待审核、已生效、已过期、已终止")
     department: str = Field(title="所属部门", max_length=50)
     creator: str = Field(title="创建人", max_length=50)
-    create_time: datetime.datetime = Field(default_factory=datetime.datetime.now, title="创建时间")
-    update_time: datetime.datetime = Field(default_factory=datetime.datetime.now, title="更新时间")
+    create_time: Optional[datetime.datetime] = Field(
+        default=None, title="创建时间",
+        sa_column=Column(DateTime, nullable=False, server_default=func.now())
+    )
+    update_time: Optional[datetime.datetime] = Field(
+        default=None, title="更新时间",
+        sa_column=Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    )
     description: str = Field(default="", title="合同描述")
 
 
@@ -62,8 +69,14 @@ class Quote(SQLModel, table=True):
     customer_phone: str = Field(title="客户电话", max_length=20)
     products: str = Field(title="产品列表", description="JSON格式的产品列表")
     total_price: float = Field(title="总价", ge=0)
-    created_at: datetime.datetime = Field(default_factory=datetime.datetime.now, title="创建时间")
-    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.now, title="更新时间")
+    created_at: Optional[datetime.datetime] = Field(
+        default=None, title="创建时间",
+        sa_column=Column(DateTime, nullable=False, server_default=func.now())
+    )
+    updated_at: Optional[datetime.datetime] = Field(
+        default=None, title="更新时间",
+        sa_column=Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    )
     status: str = Field(default="draft", title="状态", description="draft: 草稿, sent: 已发送, accepted: 已接受, rejected: 已拒绝")
 
 
@@ -82,34 +95,39 @@ class Project(SQLModel, table=True):
     amount: float = Field(title="项目金额", ge=0)
     status: str = Field(title="项目状态", default="pending", description="待开始、进行中、已完成、已暂停、已终止")
     contract_id: Optional[int] = Field(title="关联合同ID", foreign_key="contracts_original.id", nullable=True)
-    create_time: datetime.datetime = Field(default_factory=datetime.datetime.now, title="创建时间")
-    update_time: datetime.datetime = Field(default_factory=datetime.datetime.now, title="更新时间")
+    create_time: Optional[datetime.datetime] = Field(
+        default=None, title="创建时间",
+        sa_column=Column(DateTime, nullable=False, server_default=func.now())
+    )
+    update_time: Optional[datetime.datetime] = Field(
+        default=None, title="更新时间",
+        sa_column=Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    )
+
 
+# 复制时需要清除的常见时间戳字段
+_TIMESTAMP_FIELDS = frozenset(('create_time', 'update_time', 'created_at', 'updated_at'))
 
-# 工具函数：清理复制数据
-def clean_copy_data(item_dict: Dict[str, Any], pk_name: str) -> Dict[str, Any]:
+
+# 工具函数：获取模型的主键名和需要复制的列名
+@lru_cache(maxsize=None)
+def _model_meta(model: type) -> Tuple[str, Tuple[str, ...]]:
     """
-    清除复制数据中的主键和时间戳
+    获取模型的主键名和需要复制的列名（不含主键和时间戳），每个模型只反射一次
     
     Args:
-        item_dict: 原始数据字典
-        pk_name: 主键字段名
+        model: 模型类
         
     Returns:
-        清理后的数据字典
+        (主键字段名, 需要复制的列名元组)
     """
-    # 创建副本，避免修改原始数据
-    cleaned_data = item_dict.copy()
-    
-    # 移除主键字段
-    cleaned_data.pop(pk_name, None)
-    
-    # 移除常见时间戳字段
-    timestamp_fields = ['create_time', 'update_time', 'created_at', 'updated_at']
-    for field in timestamp_fields:
-        cleaned_data.pop(field, None)
-    
-    return cleaned_data
+    table = model.__table__
+    pk_name = next(iter(table.primary_key.columns)).name
+    copy_columns = tuple(
+        column.name for column in table.columns
+        if column.name != pk_name and column.name not in _TIMESTAMP_FIELDS
+    )
+    return pk_name, copy_columns
 
 
 # 工具函数：生成新合同编号
@@ -124,25 +142,32 @@ def generate_contract_no(old_no: str, index: int = 1) -> str:
     Returns:
         新的合同编号
     """
-    # 尝试匹配标准合同编号格式: CONYYYYNNN
-    import re
-    match = re.match(r"(CON\d{4})(\d{3})", old_no)
-    if match:
-        prefix = match.group(1)
-        num = int(match.group(2)) + index
-        return f"{prefix}{num:03d}"
+    # 尝试匹配标准合同编号格式: CONYYYYNNN（固定前缀加7位数字，直接切片判断，无需正则）
+    if len(old_no) >= 10 and old_no.startswith("CON") and old_no[3:10].isdecimal():
+        num = int(old_no[7:10]) + index
+        return f"{old_no[:7]}{num:03d}"
     
     # 如果不匹配标准格式，添加后缀
     return f"{old_no}_copy_{index}"
 
 
-# 工具函数：根据模型类型处理复制数据
-def process_model_data(item_dict: Dict[str, Any], model_name: str, index: int = 1, reset_status: bool = True) -> Dict[str, Any]:
+# 工具函数：构建复制数据
+def build_copy_payload(
+    item_dict: Dict[str, Any],
+    pk_name: str,
+    model_name: str,
+    index: int = 1,
+    reset_status: bool = True
+) -> Dict[str, Any]:
     """
-    根据模型类型处理复制数据
+    根据原始数据构建一条副本数据
+    
+    一次遍历完成清理（移除主键和时间戳）和按模型类型的处理，只生成一个新字典，
+    不修改原始数据。
     
     Args:
         item_dict: 原始数据字典
+        pk_name: 主键字段名
         model_name: 模型名称
         index: 复制索引
         reset_status: 是否重置状态
@@ -150,39 +175,41 @@ def process_model_data(item_dict: Dict[str, Any], model_name: str, index: int =
     Returns:
         处理后的数据字典
     """
-    # 创建副本，避免修改原始数据
-    processed_data = item_dict.copy()
+    payload = {
+        key: value for key, value in item_dict.items()
+        if key != pk_name and key not in _TIMESTAMP_FIELDS
+    }
     
     if model_name == 'Contract':
         # 生成新的合同编号
-        old_contract_no = processed_data.get('contract_no', '')
+        old_contract_no = payload.get('contract_no', '')
         if old_contract_no:
-            processed_data['contract_no'] = generate_contract_no(old_contract_no, index)
+            payload['contract_no'] = generate_contract_no(old_contract_no, index)
         
         # 重置状态为草稿
         if reset_status:
-            processed_data['status'] = 'draft'
+            payload['status'] = 'draft'
     
     elif model_name == 'Quote':
         # 重置状态为草稿
         if reset_status:
-            processed_data['status'] = 'draft'
+            payload['status'] = 'draft'
     
     elif model_name == 'Project':
         # 重置状态为待开始
         if reset_status:
-            processed_data['status'] = 'pending'
+            payload['status'] = 'pending'
         
         # 清空实际时间字段
-        processed_data['actual_start_time'] = None
-        processed_data['actual_end_time'] = None
+        payload['actual_start_time'] = None
+        payload['actual_end_time'] = None
     
     # 添加复制标记（仅当复制多个时）
     if index > 1:
-        name = processed_data.get('name', '')
-        processed_data['name'] = f"{name} (副本{index})"
+        name = payload.get('name', '')
+        payload['name'] = f"{name} (副本{index})"
     
-    return processed_data
+    return payload
 
 
 # 复制新增动作类
@@ -211,23 +238,21 @@ class CopyCreateAction(admin.ModelAction):
         super().__init__(admin, **kwargs)
         # 保存admin引用
         self.admin = admin
-    
-    async def get_action(self, request: Request, **kwargs) -> Action:
-        """获取动作配置，自定义弹窗表单"""
-        # 获取默认动作配置
-        action = await super().get_action(request, **kwargs)
-        
-        # 获取模型管理员的路由路径
-        admin = self.admin
-        router_path = admin.router_path if hasattr(admin, 'router_path') else admin.router.prefix
-        
-        # 自定义弹窗表单
-        action.dialog.body = {
+        # 缓存的弹窗表单配置及其提交地址
+        self._dialog_body: Optional[Dict[str, Any]] = None
+        self._dialog_body_url: Optional[str] = None
+    
+    def _get_dialog_body(self, url: str) -> Dict[str, Any]:
+        """获取弹窗表单配置，按提交地址缓存，只在首次或地址变化时构建"""
+        if self._dialog_body is not None and self._dialog_body_url == url:
+            return self._dialog_body
+        self._dialog_body_url = url
+        self._dialog_body = {
             "type": "form",
             "title": "复制参数设置",
             "api": {
                 "method": "post",
-                "url": f"{router_path}{self.page_path}",
+                "url": url,
                 "data": {
                     "copy_count": "${copy_count}",
                     "reset_status": "${reset_status}",
@@ -273,6 +298,19 @@ class CopyCreateAction(admin.ModelAction):
                 }
             ]
         }
+        return self._dialog_body
+    
+    async def get_action(self, request: Request, **kwargs) -> Action:
+        """获取动作配置，自定义弹窗表单"""
+        # 获取默认动作配置
+        action = await super().get_action(request, **kwargs)
+        
+        # 获取模型管理员的路由路径
+        admin = self.admin
+        router_path = admin.router_path if hasattr(admin, 'router_path') else admin.router.prefix
+        
+        # 自定义弹窗表单（表单结构固定，只依赖提交地址，缓存后复用）
+        action.dialog.body = self._get_dialog_body(f"{router_path}{self.page_path}")
         
         return action
     
@@ -285,93 +323,110 @@ class CopyCreateAction(admin.ModelAction):
             copy_related = data.get('copy_related', False) if data else False
             
             # 添加调试日志
-            logger.debug(f"复制参数: copy_count={copy_count}, reset_status={reset_status}, copy_related={copy_related}")
+            logger.debug("复制参数: copy_count=%s, reset_status=%s, copy_related=%s", copy_count, reset_status, copy_related)
             
             # 验证参数
             if copy_count < 1 or copy_count > 10:
-                return {"status": -1, "msg": "复制数量必须在1-10之间"}
+                return ORJSONResponse({"status": -1, "msg": "复制数量必须在1-10之间"})
             
             # 获取模型类
             model = self.get_model(request)
             
             # 获取主键名称
-            pk_name = model.__table__.primary_key.columns.keys()[0]
-            logger.debug(f"模型: {model.__name__}, 主键字段: {pk_name}")
+            table = model.__table__
+            pk_name, copy_columns = _model_meta(model)
+            logger.debug("模型: %s, 主键字段: %s", model.__name__, pk_name)
             
-            # 获取原始数据
+            # 获取原始数据：只查询需要复制的列，结果为行元组，不构造ORM对象
+            stmt = select(*(table.c[name] for name in copy_columns))
             if item_id and len(item_id) > 0:
                 # 从数据库获取原始数据
-                logger.debug(f"从数据库获取原始数据，ID列表: {item_id}")
-                original_items = await request.state.session.execute(
-                    select(model).where(model.id.in_(item_id))
-                )
-                original_items = original_items.scalars().all()
+                logger.debug("从数据库获取原始数据，ID列表: %s", item_id)
+                stmt = stmt.where(table.c[pk_name].in_(item_id))
             else:
                 # 如果没有item_id，从data中获取
                 if not data or 'id' not in data:
-                    return {"status": -1, "msg": "缺少要复制的数据ID"}
-                logger.debug(f"从data中获取原始数据，ID: {data['id']}")
-                original_item = await request.state.session.get(model, data['id'])
-                original_items = [original_item] if original_item else []
+                    return ORJSONResponse({"status": -1, "msg": "缺少要复制的数据ID"})
+                logger.debug("从data中获取原始数据，ID: %s", data['id'])
+                stmt = stmt.where(table.c[pk_name] == data['id'])
+            original_items = (await request.state.session.execute(stmt)).all()
             
             if not original_items:
-                return {"status": -1, "msg": "未找到要复制的数据"}
+                return ORJSONResponse({"status": -1, "msg": "未找到要复制的数据"})
             
-            logger.debug(f"找到 {len(original_items)} 条原始数据")
+            logger.debug("找到 %d 条原始数据", len(original_items))
             
-            # 复制数据
-            result = []
-            for original_item in original_items:
-                # 转换为字典
-                item_dict = self.model_to_dict(original_item, request=request)
-                logger.debug(f"原始数据字典: {item_dict}")
-                
-                # 清理数据（移除主键和时间戳）
-                cleaned_data = clean_copy_data(item_dict, pk_name)
-                logger.debug(f"清理后数据: {cleaned_data}")
-                
-                # 复制指定次数
-                for i in range(copy_count):
-                    # 处理复制数据
-                    processed_data = process_model_data(
-                        cleaned_data, 
-                        self.model_name, 
-                        i + 1,  # 从1开始计数
-                        reset_status
-                    )
-                    logger.debug(f"处理后的数据 (副本{i+1}): {processed_data}")
-                    
-                    # 创建新记录
-                    new_item = model(**processed_data)
-                    request.state.session.add(new_item)
-                    await request.state.session.flush()  # 获取新ID
-                    logger.debug(f"创建新记录，ID: {new_item.id}")
+            # 循环内的调试日志只在启用DEBUG级别时输出
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+            
+            # 复制数据，先收集所有待插入的行，最后一次性批量插入
+            if copy_count == 1:
+                # 常见情况：每条原始数据只复制一份，直接由行映射构建副本（副本1不改名）
+                rows = [
+                    build_copy_payload(original_item._mapping, pk_name, self.model_name, 1, reset_status)
+                    for original_item in original_items
+                ]
+            else:
+                rows = []
+                for original_item in original_items:
+                    # 行映射即为原始数据字典
+                    item_dict = original_item._mapping
+                    logger.debug("原始数据字典: %s", item_dict)
                     
-                    result.append({
-                        "id": new_item.id,
-                        "name": getattr(new_item, 'name', ''),
-                        "contract_no": getattr(new_item, 'contract_no', ''),
-                        "status": getattr(new_item, 'status', '')
-                    })
+                    # 复制指定次数
+                    for i in range(copy_count):
+                        # 构建副本数据（移除主键和时间戳并按模型处理）
+                        processed_data = build_copy_payload(
+                            item_dict,
+                            pk_name,
+                            self.model_name, 
+                            i + 1,  # 从1开始计数
+                            reset_status
+                        )
+                        if debug_enabled:
+                            logger.debug("处理后的数据 (副本%d): %s", i + 1, processed_data)
+                        
+                        # 副本数据已包含所有需要复制的列，直接作为待插入的行，不构造ORM对象（时间戳由数据库生成）
+                        rows.append(processed_data)
+            
+            # 单条 INSERT ... RETURNING 批量插入并取回新ID，避免逐条 flush
+            returning_columns = [table.c[pk_name]] + [
+                table.c[name] for name in ('name', 'contract_no', 'status') if name in table.c
+            ]
+            inserted = await request.state.session.execute(
+                insert(table).returning(*returning_columns, sort_by_parameter_order=True),
+                rows
+            )
+            result = [
+                {
+                    "id": row[pk_name],
+                    "name": row.get('name', ''),
+                    "contract_no": row.get('contract_no', ''),
+                    "status": row.get('status', '')
+                }
+                for row in inserted.mappings()
+            ]
+            if debug_enabled:
+                logger.debug("批量创建新记录，ID: %s", [item['id'] for item in result])
             
             # 提交事务
             await request.state.session.commit()
-            logger.debug(f"事务已提交，总共创建了 {len(result)} 条记录")
+            logger.debug("事务已提交，总共创建了 %d 条记录", len(result))
             
-            return {
+            return ORJSONResponse({
                 "status": 0,
                 "msg": f"成功复制{len(result)}条数据",
                 "data": result
-            }
+            })
             
         except Exception as e:
             # 回滚事务
             await request.state.session.rollback()
-            logger.error(f"复制失败: {str(e)}")
-            return {
+            logger.error("复制失败: %s", e)
+            return ORJSONResponse({
                 "status": -1,
                 "msg": f"复制失败: {str(e)}"
-            }
+            })
 
 
 # 快速复制动作类
@@ -441,6 +496,7 @@ class QuickCopyAction(admin.ModelAdmin, admin.RouterAdmin):
             self.handle,
             methods=["POST"],
             response_model=BaseApiOut,
+            response_class=ORJSONResponse,
             name=f"{self.name}_route"
         )
         return self
@@ -456,62 +512,61 @@ class QuickCopyAction(admin.ModelAdmin, admin.RouterAdmin):
             if not item_id:
                 return BaseApiOut(status=1, msg="缺少必要参数: item_id")
             
-            logger.debug(f"快速复制，ID: {item_id}")
+            logger.debug("快速复制，ID: %s", item_id)
             
             # 获取模型类 - 从admin对象获取
             model = self.admin.model
             
-            # 获取主键名称
-            pk_name = model.__table__.primary_key.columns.keys()[0]
-            logger.debug(f"模型: {model.__name__}, 主键字段: {pk_name}")
+            # 获取主键名称和需要复制的列
+            table = model.__table__
+            pk_name, copy_columns = _model_meta(model)
+            logger.debug("模型: %s, 主键字段: %s", model.__name__, pk_name)
             
             # 使用request.state.session获取数据库会话
-            # 查询原始数据
-            stmt = select(model).where(model.__table__.c[pk_name] == item_id)
+            # 查询原始数据：只查询需要复制的列，结果为行元组，不构造ORM对象
+            stmt = select(*(table.c[name] for name in copy_columns)).where(table.c[pk_name] == item_id)
             result = await request.state.session.execute(stmt)
-            item = result.scalar_one_or_none()
+            item = result.one_or_none()
             
             if not item:
                 return BaseApiOut(status=1, msg="未找到要复制的数据")
             
-            # 转换为字典
-            item_dict = item.dict()
-            logger.debug(f"原始数据: {item_dict}")
+            # 行映射即为原始数据字典
+            item_dict = item._mapping
+            logger.debug("原始数据: %s", item_dict)
             
-            # 清理数据（移除主键和时间戳）
-            cleaned_data = clean_copy_data(item_dict, pk_name)
-            logger.debug(f"清理后数据: {cleaned_data}")
-            
-            # 处理数据
-            processed_data = process_model_data(
-                cleaned_data, 
+            # 构建副本数据（移除主键和时间戳并按模型处理）
+            processed_data = build_copy_payload(
+                item_dict,
+                pk_name,
                 model.__name__, 
                 1,  # 快速复制只复制一条
                 True  # 快速复制默认重置状态
             )
-            logger.debug(f"处理后的数据: {processed_data}")
+            logger.debug("处理后的数据: %s", processed_data)
             
-            # 创建新对象
-            new_item = model(**processed_data)
-            request.state.session.add(new_item)
+            # 直接插入副本数据并取回新ID（时间戳由数据库生成）
+            inserted = await request.state.session.execute(
+                insert(table).values(processed_data).returning(table.c[pk_name])
+            )
+            new_id = inserted.scalar_one()
             await request.state.session.commit()
-            await request.state.session.refresh(new_item)
-            logger.debug(f"快速复制成功，新记录ID: {new_item.id}")
+            logger.debug("快速复制成功，新记录ID: %s", new_id)
             
             # 返回成功结果
             return BaseApiOut(
                 status=0, 
                 msg="复制成功",
-                data={"id": new_item.id}
+                data={"id": new_id}
             )
                 
         except IntegrityError as e:
             # 处理唯一约束冲突
-            logger.error(f"快速复制失败：数据冲突，请检查唯一约束 - {str(e)}")
+            logger.error("快速复制失败：数据冲突，请检查唯一约束 - %s", e)
             return BaseApiOut(status=1, msg="复制失败：数据冲突，请检查唯一约束")
         except Exception as e:
             # 处理其他异常
-            logger.error(f"快速复制失败：{str(e)}")
+            logger.error("快速复制失败：%s", e)
             return BaseApiOut(status=1, msg=f"复制失败：{str(e)}")
 
 
@@ -560,13 +615,16 @@ if __name__ == "__main__":
     import uvicorn
     from fastapi import FastAPI
     
+    # 配置日志（仅在直接运行演示时输出调试日志）
+    logging.basicConfig(level=logging.DEBUG)
+    
     print("启动FastAPI-Amis-Admin复制功能演示应用...")
     print("访问地址: http://127.0.0.1:8001/admin")
     print("用户名: admin")
     print("密码: admin")
     
     # 创建FastAPI应用
-    app = FastAPI()
+    app = FastAPI(default_response_class=ORJSONResponse)
     
     # 挂载后台管理系统
     site.mount_app(app)
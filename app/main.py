@@ -1,29 +1,32 @@
 # 1. 基础导入（规范排序 + 补充缺失依赖）
+import asyncio
+import logging
 import os
 import sys
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl
 
 # FastAPI 核心导入
 from fastapi import FastAPI, Request, HTTPException, Depends, Form, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, HTMLResponse, Response
+from fastapi.responses import JSONResponse, HTMLResponse, Response, ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.security.utils import get_authorization_scheme_param
 from fastapi.exceptions import RequestValidationError
 
 # 第三方依赖
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from jose import JWTError, jwt
+from jose import JWTError
 from pydantic import ValidationError
 
 # 2. 核心配置导入（绝对导入 + 补充类型提示）
 from app.core.config import settings
-from app.core.db import init_db, get_async_db, engine  # 补充engine定义
+from app.core.db import init_db, get_async_db, get_engine, engine  # 补充engine定义
 from app.core.logging import logger
-from app.core.auth import authenticate_user, create_access_token, create_refresh_token
+from app.core.auth import authenticate_user, create_access_token, create_refresh_token, decode_token_cached, get_client_ip, purge_expired_auth_caches
 from app.admin.site import site  # Amis Admin站点
 
 # 3. 路由导入（整理顺序，统一命名）
@@ -43,12 +46,15 @@ from app.api.batch_import import router as batch_import_router
 # 4. 中间件导入（修正重复编号，规范顺序）
 from app.middleware.error_handling import ErrorHandlingMiddleware
 from app.core.middleware.auth import AuthenticationMiddleware
+from app.core.middleware.db_session import DBSessionMiddleware
 from app.middleware.amis_cdn import amis_cdn_middleware
-from app.middleware.clipboard_injection import clipboard_script_injection_middleware
+from app.middleware.amis_resource import close_cdn_client
+from app.middleware.clipboard_injection import ClipboardScriptInjectionMiddleware
 from app.middleware.token_verification import TokenVerificationMiddleware
 
 # 5. 工具/模型导入（补充缺失依赖）
-from app.utils.captcha import create_captcha, verify_captcha
+from app.utils.captcha import create_captcha, verify_captcha, hash_captcha_key, captcha_manager
+from app.utils.static_files import CachedStaticFiles
 from app.users.api.schemas import TokenResponse, LoginRequest, UserResponse  # 补充用户模型
 
 # ======================
@@ -56,20 +62,51 @@ from app.users.api.schemas import TokenResponse, LoginRequest, UserResponse  # 
 # ======================
 class DatabaseManager:
     """数据库连接管理器（补充健康检查依赖）"""
+
+    def __init__(self) -> None:
+        # 后台任务定期刷新的最近一次健康检查结果，健康检查接口直接读取
+        self.last_health: Dict[str, str] = {"status": "unknown", "message": "尚未完成数据库健康检查"}
+
     @staticmethod
     async def health_check() -> Dict[str, str]:
         """检查数据库连接状态"""
         try:
-            async with engine.connect() as conn:
-                await conn.execute("SELECT 1")  # 测试查询
-                return {"status": "healthy", "message": "数据库连接正常"}
+            # 模块导入时的engine在init_db之前为None，这里从连接管理器获取已初始化的引擎
+            db_engine = await get_engine()
+            async with db_engine.connect() as conn:
+                # 单次往返取回标量结果，不保留结果游标
+                value = await conn.scalar(text("SELECT 1"))
+            if value != 1:
+                return {"status": "unhealthy", "message": f"数据库测试查询返回异常结果: {value}"}
+            return {"status": "healthy", "message": "数据库连接正常"}
         except Exception as e:
             logger.error(f"数据库健康检查失败: {str(e)}")
             return {"status": "unhealthy", "message": str(e)}
 
+    async def refresh_health(self, interval: float) -> None:
+        """后台定期检查数据库状态并更新last_health（由应用生命周期启动和取消）"""
+        while True:
+            self.last_health = await self.health_check()
+            await asyncio.sleep(interval)
+
 # 全局数据库管理器实例
 db_manager = DatabaseManager()
 
+# 后台清理过期缓存的间隔（秒）
+CACHE_SWEEP_INTERVAL = 10
+
+
+async def sweep_expired_caches(interval: float) -> None:
+    """后台定期统一清理各内存缓存中的过期条目（令牌解码、登录认证、验证码）"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = purge_expired_auth_caches() + captcha_manager.clean_expired_captchas()
+            if removed:
+                logger.debug("已清理过期缓存条目: %d", removed)
+        except Exception as e:
+            logger.warning(f"清理过期缓存失败: {str(e)}")
+
 # ======================
 # 应用生命周期管理（增强错误处理）
 # ======================
@@ -80,11 +117,18 @@ async def lifespan(app: FastAPI):
     参考：https://fastapi.tiangolo.com/advanced/events/
     """
     logger.info(f"启动{settings.APP_NAME} v{settings.APP_VERSION} (DEBUG: {settings.DEBUG})")
+    health_task = None
+    sweep_task = None
     try:
         # 初始化数据库
         await init_db()
         logger.info("数据库初始化完成")
         
+        # 启动后台数据库健康检查，健康检查接口不再每次请求都访问数据库
+        health_task = asyncio.create_task(db_manager.refresh_health(settings.DATABASE_HEALTH_CHECK_INTERVAL))
+        # 启动后台过期缓存清理
+        sweep_task = asyncio.create_task(sweep_expired_caches(CACHE_SWEEP_INTERVAL))
+        
         # 初始化Amis Admin站点
         logger.info(f"挂载Amis Admin到路径: {settings.ADMIN_PATH}")
         
@@ -93,22 +137,40 @@ async def lifespan(app: FastAPI):
         logger.error(f"应用启动失败: {str(e)}", exc_info=True)
         raise
     finally:
+        # 停止后台健康检查和缓存清理
+        if health_task is not None:
+            health_task.cancel()
+        if sweep_task is not None:
+            sweep_task.cancel()
         # 安全关闭数据库引擎
         try:
             await engine.dispose()
             logger.info("数据库引擎已关闭")
         except Exception as e:
             logger.warning(f"关闭数据库引擎失败: {str(e)}")
+        # 关闭Amis资源中间件复用的CDN客户端
+        await close_cdn_client()
         logger.info("应用已正常关闭")
 
 # ======================
 # 创建FastAPI应用实例（最佳实践配置）
 # ======================
+# 安装了orjson时使用orjson解析请求体、ORJSONResponse序列化接口响应，否则退回标准库json
+try:
+    import orjson
+    DefaultResponseClass = ORJSONResponse
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    DefaultResponseClass = JSONResponse
+    json_loads = json.loads
+
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
     lifespan=lifespan,
+    default_response_class=DefaultResponseClass,
     docs_url="/docs" if settings.DEBUG else None,  # 生产环境关闭docs
     redoc_url="/redoc" if settings.DEBUG else None,
     openapi_url="/openapi.json" if settings.DEBUG else None,
@@ -125,6 +187,7 @@ app.add_middleware(
     allow_credentials=settings.CORS_ALLOW_CREDENTIALS,
     allow_methods=settings.CORS_ALLOW_METHODS,
     allow_headers=settings.CORS_ALLOW_HEADERS,
+    max_age=settings.CORS_MAX_AGE,
 )
 
 # 2. 统一错误处理中间件（捕获所有异常）
@@ -134,13 +197,16 @@ app.add_middleware(ErrorHandlingMiddleware)
 app.add_middleware(AuthenticationMiddleware)
 
 # 4. Token验证中间件（令牌有效性检查）
-app.add_middleware(TokenVerificationMiddleware)
+app.add_middleware(TokenVerificationMiddleware, admin_path=settings.ADMIN_PATH)
 
 # 5. Amis CDN中间件（静态资源优化）
 app.middleware("http")(amis_cdn_middleware)
 
 # 6. 剪贴板脚本注入中间件（前端功能支持）
-app.middleware("http")(clipboard_script_injection_middleware)
+app.add_middleware(ClipboardScriptInjectionMiddleware, admin_path=settings.ADMIN_PATH)
+
+# 7. 请求级数据库会话中间件（请求结束时关闭get_request_db创建的会话）
+app.add_middleware(DBSessionMiddleware)
 
 # ======================
 # 静态文件挂载（鲁棒性优化 + 路径验证）
@@ -158,7 +224,7 @@ if not os.path.exists(static_dir):
 # 挂载静态文件（添加缓存控制，提升性能）
 app.mount(
     "/static",
-    StaticFiles(
+    CachedStaticFiles(
         directory=static_dir,
         html=True  # 支持静态HTML文件
     ),
@@ -168,7 +234,7 @@ app.mount(
 # ======================
 # API路由注册（批量注册 + 日志记录）
 # ======================
-api_routers = [
+api_routers = (
     (users_router, "/api"),
     (auth_router, "/api"),
     (contracts_router, "/api"),
@@ -181,13 +247,15 @@ api_routers = [
     (copy_router, "/api"),
     (general_file_router, "/api"),
     (batch_import_router, "/api"),
-]
+)
 
-# 批量注册并记录日志
+# 批量注册，注册完成后合并为一条日志
 for router, prefix in api_routers:
-    router_name = router.prefix if router.prefix else router.tags[0] if router.tags else "unknown"
     app.include_router(router, prefix=prefix)
-    logger.info(f"注册API路由: {prefix} -> {router_name}")
+logger.info(
+    "注册API路由: %s",
+    [f"{prefix} -> {router.prefix or (router.tags[0] if router.tags else 'unknown')}" for router, prefix in api_routers],
+)
 
 # ======================
 # Amis Admin挂载（核心功能）
@@ -221,20 +289,20 @@ async def login(
     
     # 解析请求体
     try:
-        content_type = request.headers.get("content-type", "")
+        raw_body = await request.body()
         
-        if "application/json" in content_type:
-            body = await request.json()
-            username = body.get("username")
-            password = body.get("password")
-            captcha_key = body.get("captcha_key")
-            captcha_code = body.get("captcha_code")
+        # 登录页面提交的是JSON，按请求体首字符直接判断，JSON以外的才查看content-type
+        if raw_body.lstrip()[:1] == b"{":
+            body = json_loads(raw_body)
+        elif "multipart/form-data" in request.headers.get("content-type", ""):
+            body = await request.form()
         else:
-            form = await request.form()
-            username = form.get("username")
-            password = form.get("password")
-            captcha_key = form.get("captcha_key")
-            captcha_code = form.get("captcha_code")
+            # urlencoded表单直接解析原始请求体，不经过通用的表单解析器
+            body = dict(parse_qsl(raw_body.decode("utf-8")))
+        username = body.get("username")
+        password = body.get("password")
+        captcha_key = body.get("captcha_key")
+        captcha_code = body.get("captcha_code")
     except Exception as e:
         logger.error(f"解析请求体失败: {e}")
         raise HTTPException(status_code=400, detail="请求数据格式错误")
@@ -247,7 +315,7 @@ async def login(
         if not captcha_key or not captcha_code:
             raise HTTPException(status_code=400, detail="验证码信息不完整")
         if not await verify_captcha(captcha_key, captcha_code):
-            logger.warning(f"验证码验证失败: 密钥={captcha_key[:8]}... 输入={captcha_code}")
+            logger.warning(f"验证码验证失败: 密钥={hash_captcha_key(captcha_key).hex()[:8]} 输入={captcha_code}")
             raise HTTPException(status_code=400, detail="验证码错误")
 
     # 2. 验证用户身份
@@ -270,11 +338,11 @@ async def login(
         raise HTTPException(status_code=500, detail="生成认证令牌失败")
 
     # 4. 记录登录日志
-    client_ip = request.client.host if request.client else "unknown"
-    logger.info(f"用户登录成功: 用户名={username} IP={client_ip}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("用户登录成功: 用户名=%s IP=%s", username, get_client_ip(request) or "unknown")
 
     # 5. 返回标准化结果
-    return TokenResponse(
+    token_response = TokenResponse(
         access_token=access_token,
         refresh_token=refresh_token,
         token_type="bearer",
@@ -285,6 +353,8 @@ async def login(
             roles=["admin"] if user["is_superuser"] else ["user"]
         )
     )
+    # 已通过模型校验，直接序列化返回，跳过jsonable_encoder的逐字段转换
+    return DefaultResponseClass(content=token_response.model_dump(mode="json"))
 
 @app.get("/api/auth/verify")
 async def verify_token(request: Request):
@@ -300,7 +370,7 @@ async def verify_token(request: Request):
             scheme = "bearer"
 
         if scheme.lower() != "bearer" or not token:
-            return JSONResponse(
+            return DefaultResponseClass(
                 status_code=200,
                 content={
                     "code": 401,
@@ -310,18 +380,14 @@ async def verify_token(request: Request):
             )
 
         # 解码并验证Token
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-            options={"verify_exp": True}  # 验证过期时间
-        )
+        # 解码结果短时缓存，重复验证同一令牌时不再做签名校验（同时验证过期时间）
+        payload = decode_token_cached(token)
         username = payload.get("sub")
 
         if not username:
             raise JWTError("Token中缺少用户名信息")
 
-        return JSONResponse(
+        return DefaultResponseClass(
             status_code=200,
             content={
                 "code": 200,
@@ -336,7 +402,7 @@ async def verify_token(request: Request):
 
     except JWTError as e:
         logger.warning(f"Token验证失败: {str(e)}")
-        return JSONResponse(
+        return DefaultResponseClass(
             status_code=200,
             content={
                 "code": 401,
@@ -346,7 +412,7 @@ async def verify_token(request: Request):
         )
     except Exception as e:
         logger.error(f"验证令牌异常: {str(e)}", exc_info=True)
-        return JSONResponse(
+        return DefaultResponseClass(
             status_code=200,
             content={
                 "code": 500,
@@ -355,44 +421,39 @@ async def verify_token(request: Request):
             }
         )
 
-@app.get("/api/health", response_class=JSONResponse)
-async def health_check():
-    """健康检查接口（增强版，含详细状态）"""
-    health_status = {
-        "app": {
-            "name": settings.APP_NAME,
-            "version": settings.APP_VERSION,
-            "status": "healthy",
-            "debug": settings.DEBUG
-        },
-        "database": {
-            "status": "unknown",
-            "message": ""
-        },
-        "system": {
-            "python_version": sys.version,
-            "platform": sys.platform
-        }
+# 健康检查中不变的应用和系统信息，启动时构建一次
+STATIC_HEALTH_INFO = {
+    "app": {
+        "name": settings.APP_NAME,
+        "version": settings.APP_VERSION,
+        "status": "healthy",
+        "debug": settings.DEBUG
+    },
+    "system": {
+        "python_version": sys.version,
+        "platform": sys.platform
     }
+}
 
-    # 检查数据库连接
-    try:
-        db_health = await db_manager.health_check()
-        health_status["database"] = db_health
-    except Exception as e:
-        health_status["database"] = {
-            "status": "error",
-            "message": str(e)
-        }
+
+@app.get("/api/health", response_class=DefaultResponseClass)
+async def health_check():
+    """健康检查接口（增强版，含详细状态）"""
+    # 数据库状态由后台任务定期刷新，这里直接读取最近一次检查结果
+    database_health = db_manager.last_health
 
     # 整体状态判断
-    overall_status = "healthy" if health_status["database"]["status"] == "healthy" else "unhealthy"
+    overall_status = "healthy" if database_health["status"] == "healthy" else "unhealthy"
 
-    return JSONResponse(
+    return DefaultResponseClass(
         content={
             "code": 200 if overall_status == "healthy" else 503,
             "message": overall_status,
-            "data": health_status
+            "data": {
+                "app": STATIC_HEALTH_INFO["app"],
+                "database": database_health,
+                "system": STATIC_HEALTH_INFO["system"]
+            }
         }
     )
 
@@ -415,15 +476,8 @@ async def root():
         }
     }
 
-@app.get("/login", response_class=HTMLResponse)
-async def login_page(request: Request, redirect: Optional[str] = None):
-    """登录页面（优化版，支持验证码开关）"""
-    redirect_url = redirect or settings.ADMIN_PATH
-    captcha_display = "flex" if settings.ENABLE_CAPTCHA else "none"
-    captcha_enabled = str(settings.ENABLE_CAPTCHA).lower()
-
-    # 读取HTML模板（避免硬编码，可优化为文件读取）
-    html_template = """
+# 登录页面HTML模板
+LOGIN_PAGE_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="zh-CN">
 <head>
@@ -726,14 +780,29 @@ async def login_page(request: Request, redirect: Optional[str] = None):
     </script>
 </body>
 </html>
-    """.format(
+    """
+
+
+def render_login_page(redirect_url: str) -> str:
+    """渲染登录页面"""
+    return LOGIN_PAGE_TEMPLATE.format(
         app_name=settings.APP_NAME,
         redirect_url=redirect_url,
-        captcha_display=captcha_display,
-        captcha_enabled=captcha_enabled
+        captcha_display="flex" if settings.ENABLE_CAPTCHA else "none",
+        captcha_enabled=str(settings.ENABLE_CAPTCHA).lower()
     )
 
-    return HTMLResponse(content=html_template)
+
+# 默认跳转地址的登录页面内容固定，启动时渲染一次
+DEFAULT_LOGIN_PAGE = render_login_page(settings.ADMIN_PATH).encode("utf-8")
+
+
+@app.get("/login", response_class=HTMLResponse)
+async def login_page(request: Request, redirect: Optional[str] = None):
+    """登录页面（优化版，支持验证码开关）"""
+    if not redirect or redirect == settings.ADMIN_PATH:
+        return HTMLResponse(content=DEFAULT_LOGIN_PAGE)
+    return HTMLResponse(content=render_login_page(redirect))
 
 # ======================
 # 启动入口（使用配置文件，兼容多种启动方式）
@@ -742,11 +811,27 @@ def main() -> None:
     """应用启动入口（脚本运行）"""
     import uvicorn
 
+    # 安装了uvloop（非Windows）时使用uvloop事件循环，否则使用标准asyncio事件循环
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    # 安装了httptools时使用C实现的HTTP解析器，否则使用h11
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+    # 每个工作进程都有独立的数据库连接池，进程数默认取CPU核数，避免连接数超出数据库上限
+    workers = 1 if settings.DEBUG else (settings.WORKERS or os.cpu_count() or 1)
+
     # 打印启动信息
     logger.info("=" * 80)
     logger.info(f"启动 {settings.APP_NAME} v{settings.APP_VERSION}")
     logger.info(f"调试模式: {'开启' if settings.DEBUG else '关闭'}")
     logger.info(f"验证码功能: {'开启' if settings.ENABLE_CAPTCHA else '关闭'}")
+    logger.info(f"事件循环: {loop}, HTTP解析器: {http}, 工作进程数: {workers}")
     logger.info(f"访问地址: http://{settings.HOST}:{settings.PORT}")
     logger.info(f"管理后台: http://{settings.HOST}:{settings.PORT}{settings.ADMIN_PATH}")
     logger.info("=" * 80)
@@ -757,9 +842,14 @@ def main() -> None:
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
+        loop=loop,
+        http=http,
         log_level="info" if settings.DEBUG else "warning",
         access_log=settings.DEBUG,
-        workers=1 if settings.DEBUG else 4,  # 生产环境多进程
+        workers=workers,  # 生产环境多进程
+        backlog=4096,
+        limit_concurrency=2000,
+        timeout_keep_alive=30,
     )
 
 if __name__ == "__main__":
@@ -1,32 +1,36 @@
 from fastapi import Request, Response
 from fastapi.responses import RedirectResponse, FileResponse
-import os
 import re
 import logging
 
+from app.middleware.amis_resource import find_amis_file
+
 logger = logging.getLogger(__name__)
 
+# Amis CDN请求路径，如 /static/amis/<包名>/<版本>/<文件名>
+AMIS_CDN_PREFIX = "/static/amis/"
+AMIS_CDN_PATH_RE = re.compile(r"/static/amis/[^/]+/[^/]+/[^/]+$")
+# 响应的缓存头，所有响应共用（缓存1天，有效期内浏览器刷新页面也不重新校验）
+AMIS_CDN_RESPONSE_HEADERS = {
+    "Cache-Control": "public, max-age=86400, immutable",
+    "Access-Control-Allow-Origin": "*",
+}
+
 async def amis_cdn_middleware(request: Request, call_next):
     """Amis CDN中间件，将CDN请求重定向到本地文件"""
     path = request.url.path
     
-    # 检查是否是Amis CDN请求
-    if re.search(r"/static/amis/[^/]+/[^/]+/[^/]+$", path):
+    # 检查是否是Amis CDN请求（先用子串判断排除绝大多数无关请求，再匹配正则）
+    if AMIS_CDN_PREFIX in path and AMIS_CDN_PATH_RE.search(path):
         # 提取文件名
         filename = path.split("/")[-1]
         
-        # 检查文件是否存在于本地
-        file_path = os.path.join("E:/HSdigitalportal/fastapi_amis_admin/static/amis", filename)
-        if os.path.exists(file_path):
+        # 检查文件是否存在于本地（查启动时扫描的文件表，不逐次拼接路径、访问磁盘）
+        file_path = find_amis_file(filename)
+        if file_path is not None:
             try:
-                # 设置适当的缓存头
-                headers = {
-                    "Cache-Control": "public, max-age=86400",  # 缓存1天
-                    "Access-Control-Allow-Origin": "*",
-                }
-                
                 # 返回本地文件
-                return FileResponse(file_path, headers=headers)
+                return FileResponse(file_path, headers=AMIS_CDN_RESPONSE_HEADERS)
             except Exception as e:
                 logger.error(f"Error serving file {file_path}: {e}")
     
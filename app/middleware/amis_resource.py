@@ -1,132 +1,251 @@
 from fastapi import Request, Response
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 import os
 import re
 import httpx
-import mimetypes
 import logging
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
+# Amis资源请求路径前缀（只匹配本地路径，不匹配CDN路径）
+AMIS_RESOURCE_PREFIXES = ("/amis/", "/static/amis/")
+# 提取amis之后的相对路径
+AMIS_RELATIVE_PATH_RE = re.compile(r"/(amis|static/amis)/(.*)")
+
+# 本地Amis静态文件目录（启动时解析为绝对路径）
+AMIS_STATIC_ROOT = Path(settings.AMIS_STATIC_DIR).resolve()
+# 从CDN获取的文件在本地的缓存目录（位于Amis静态文件目录下，重启后仍可直接使用）
+AMIS_CDN_CACHE_DIR = "_cdn_cache"
+# 内存中缓存的CDN文件数量上限
+AMIS_CDN_CACHE_MAXSIZE = 512
+AMIS_CDN_BASE_URL = "https://unpkg.com/amis@6.13.0"
+
+# Amis资源响应的缓存头，所有响应共用（缓存1天，有效期内浏览器刷新页面也不重新校验）
+AMIS_RESPONSE_HEADERS = {
+    "Cache-Control": "public, max-age=86400, immutable",
+    "Access-Control-Allow-Origin": "*",
+}
+
+# Amis资源按扩展名对应的MIME类型
+AMIS_MEDIA_TYPES = {
+    ".css": "text/css",
+    ".js": "application/javascript",
+    ".mjs": "application/javascript",
+    ".json": "application/json",
+    ".map": "application/json",
+    ".html": "text/html",
+    ".woff2": "font/woff2",
+    ".woff": "font/woff",
+    ".ttf": "font/ttf",
+    ".eot": "application/vnd.ms-fontobject",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".ico": "image/x-icon",
+}
+
+# CDN文件的内存缓存：相对路径 -> (文件内容, MIME类型)
+_cdn_cache: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+# 复用的CDN客户端（首次使用时创建），保持连接避免每次请求重新建立TCP/TLS连接
+_cdn_client: Optional[httpx.AsyncClient] = None
+
+
+def _resolve_in_root(root: Path, relative_path: str) -> Optional[Path]:
+    """将相对路径解析为root下的绝对路径，越出root（../、符号链接等）时返回None"""
+    candidate = (root / relative_path).resolve()
+    if candidate != root and root not in candidate.parents:
+        return None
+    return candidate
+
+
+def _scan_amis_files() -> Dict[str, Tuple[str, str]]:
+    """扫描本地Amis静态文件目录，返回 文件相对路径（以/分隔） -> (文件完整路径, ETag)"""
+    files = {}
+    for root, _, names in os.walk(AMIS_STATIC_ROOT):
+        rel_root = os.path.relpath(root, AMIS_STATIC_ROOT).replace(os.sep, "/")
+        for name in names:
+            relative_path = name if rel_root == "." else f"{rel_root}/{name}"
+            file_path = _resolve_in_root(AMIS_STATIC_ROOT, relative_path)
+            if file_path is None:
+                continue
+            try:
+                stat_result = file_path.stat()
+            except OSError:
+                continue
+            files[relative_path] = (str(file_path), f'"{stat_result.st_mtime_ns}-{stat_result.st_size}"')
+    return files
+
+
+# 启动时扫描一次本地文件，解析出完整路径并计算ETag，请求时只做字典查找，
+# 不再逐个拼接、stat候选路径；不在字典中的路径（包括越出目录的路径）一律视为不存在
+_amis_files = _scan_amis_files()
+
+
+def find_amis_file(relative_path: str) -> Optional[str]:
+    """按相对路径精确查找本地Amis文件，返回文件完整路径，不存在时返回None"""
+    entry = _amis_files.get(relative_path)
+    return entry[0] if entry is not None else None
+
+
+def resolve_amis_file(relative_path: str) -> Optional[Tuple[str, str, Dict[str, str]]]:
+    """根据请求的相对路径查找本地Amis文件，返回(文件完整路径, MIME类型, 响应头)，不存在时返回None"""
+    # 尝试多个可能的文件路径
+    possible_paths = (
+        # 原始路径
+        relative_path,
+        # 处理sdk子目录的情况 - 如果请求sdk/sdk.js，尝试直接使用sdk.js
+        relative_path.replace("sdk/", ""),
+        # 处理其他可能的路径
+        relative_path.replace("sdk/thirds/", ""),
+        # 特别处理 rest.js 文件
+        "rest.js" if relative_path.endswith("rest.js") else None,
+        # 之前从CDN获取并缓存到本地的文件
+        f"{AMIS_CDN_CACHE_DIR}/{relative_path}",
+    )
+    # 未命中时只做几次字典查找且不缓存，避免任意不存在的路径占满缓存挤掉真实文件
+    for possible_path in possible_paths:
+        if possible_path is not None and possible_path in _amis_files:
+            return _amis_file_info(possible_path)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _amis_file_info(file_key: str) -> Tuple[str, str, Dict[str, str]]:
+    """本地Amis文件的(文件完整路径, MIME类型, 响应头)，按_amis_files中的键缓存，每个文件只构建一次"""
+    file_path, etag = _amis_files[file_key]
+    headers = {**AMIS_RESPONSE_HEADERS, "ETag": etag}
+    return file_path, _guess_media_type(file_path), headers
+
+
+def reload_amis_files() -> None:
+    """重新扫描本地Amis文件（本地文件有增删时调用）"""
+    global _amis_files
+    _amis_files = _scan_amis_files()
+    _amis_file_info.cache_clear()
+
+
+def _guess_media_type(path: str) -> str:
+    """根据扩展名返回MIME类型"""
+    return AMIS_MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+
+def _get_cdn_client() -> httpx.AsyncClient:
+    """获取复用的CDN客户端"""
+    global _cdn_client
+    if _cdn_client is None or _cdn_client.is_closed:
+        _cdn_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _cdn_client
+
+
+async def close_cdn_client() -> None:
+    """关闭CDN客户端（应用关闭时调用）"""
+    global _cdn_client
+    if _cdn_client is not None:
+        await _cdn_client.aclose()
+        _cdn_client = None
+
+
+def _save_cdn_file(relative_path: str, content: bytes) -> None:
+    """将CDN文件保存到本地缓存目录，路径越出缓存目录时不保存"""
+    file_path = _resolve_in_root(AMIS_STATIC_ROOT / AMIS_CDN_CACHE_DIR, relative_path)
+    if file_path is None:
+        return
+    try:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(content)
+    except OSError as e:
+        logger.warning(f"Failed to cache {relative_path} on disk: {e}")
+
+
+async def fetch_amis_from_cdn(relative_path: str) -> Optional[Tuple[bytes, str]]:
+    """从CDN获取Amis文件，返回(文件内容, MIME类型)，获取失败时返回None
+
+    结果缓存在内存中（LRU），并保存到本地缓存目录供重启后直接使用。
+    """
+    cached = _cdn_cache.get(relative_path)
+    if cached is not None:
+        _cdn_cache.move_to_end(relative_path)
+        return cached
+    
+    try:
+        # 构建CDN URL - 修正路径 - 更新到6.13.0版本
+        if relative_path.startswith("sdk/"):
+            cdn_url = f"{AMIS_CDN_BASE_URL}/{relative_path}"
+        else:
+            cdn_url = f"{AMIS_CDN_BASE_URL}/sdk/{relative_path}"
+        
+        logger.info(f"Fetching {relative_path} from CDN: {cdn_url}")
+        
+        # 从CDN获取文件
+        response = await _get_cdn_client().get(cdn_url)
+        if response.status_code != 200:
+            logger.warning(f"CDN returned {response.status_code} for {cdn_url}")
+            return None
+    except Exception as e:
+        logger.error(f"Failed to fetch {relative_path} from CDN: {e}")
+        return None
+    
+    # 获取正确的MIME类型，如果没有提供，根据扩展名设置默认值
+    media_type = response.headers.get("content-type", "") or _guess_media_type(relative_path)
+    resource = (response.content, media_type)
+    
+    _cdn_cache[relative_path] = resource
+    if len(_cdn_cache) > AMIS_CDN_CACHE_MAXSIZE:
+        _cdn_cache.popitem(last=False)
+    # 写磁盘放到线程池中执行，不阻塞事件循环
+    await run_in_threadpool(_save_cdn_file, relative_path, response.content)
+    return resource
+
+
 async def amis_resource_middleware(request: Request, call_next):
     """Amis资源中间件，处理所有Amis资源请求"""
     path = request.url.path
     
     # 检查是否是Amis资源请求 - 只匹配本地路径，不匹配CDN路径
-    if re.match(r"^(?:/(?:amis|static/amis))/.*", path):
+    if path.startswith(AMIS_RESOURCE_PREFIXES):
         # 处理双斜杠问题
         path = path.replace("//", "/")
         
         # 提取相对路径
         # 从路径中提取amis后的部分
-        match = re.search(r"/(amis|static/amis)/(.*)", path)
+        match = AMIS_RELATIVE_PATH_RE.search(path)
         if match:
             relative_path = match.group(2)
         else:
             relative_path = path.split("/")[-1]
         
-        # 尝试多个可能的文件路径
-        possible_paths = [
-            # 原始路径
-            relative_path,
-            # 处理sdk子目录的情况 - 如果请求sdk/sdk.js，尝试直接使用sdk.js
-            relative_path.replace("sdk/", ""),
-            # 处理其他可能的路径
-            relative_path.replace("sdk/thirds/", ""),
-            # 特别处理 rest.js 文件
-            "rest.js" if relative_path.endswith("rest.js") else None,
-        ]
-        
         # 尝试找到存在的文件
-        file_path = None
-        for possible_path in possible_paths:
-            if possible_path is None:
-                continue
-            test_path = os.path.join("E:/HSdigitalportal/fastapi_amis_admin/static/amis", possible_path)
-            if os.path.exists(test_path):
-                file_path = test_path
-                break
+        local_file = resolve_amis_file(relative_path)
         
-        if file_path:
-            # 使用mimetypes库获取正确的MIME类型
-            media_type, _ = mimetypes.guess_type(file_path)
-            if not media_type:
-                # 如果无法猜测，根据扩展名设置默认值
-                if file_path.endswith(".css"):
-                    media_type = "text/css"
-                elif file_path.endswith(".js"):
-                    media_type = "application/javascript"
-                elif file_path.endswith(".woff2"):
-                    media_type = "font/woff2"
-                elif file_path.endswith(".woff"):
-                    media_type = "font/woff"
-                elif file_path.endswith(".ttf"):
-                    media_type = "font/ttf"
-                elif file_path.endswith(".svg"):
-                    media_type = "image/svg+xml"
-                else:
-                    media_type = "application/octet-stream"
+        if local_file:
+            file_path, media_type, headers = local_file
+            etag = headers["ETag"]
             
-            try:
-                # 读取文件内容
-                with open(file_path, "rb") as f:
-                    content = f.read()
-                
-                # 设置适当的缓存头
-                headers = {
-                    "Cache-Control": "public, max-age=86400",  # 缓存1天
-                    "Access-Control-Allow-Origin": "*",
-                }
-                
-                return Response(content=content, media_type=media_type, headers=headers)
-            except Exception as e:
-                logger.error(f"Error reading file {file_path}: {e}")
-                # 继续处理，返回404
+            # 浏览器缓存的版本未变化时直接返回304，不读取文件
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+                return Response(status_code=304, headers=headers)
+            
+            # FileResponse分块发送文件（支持时使用sendfile），不把整个文件读入内存
+            return FileResponse(file_path, media_type=media_type, headers=headers)
         else:
-            # 如果本地文件不存在，尝试从CDN获取
-            try:
-                # 构建CDN URL - 修正路径 - 更新到6.13.0版本
-                if relative_path.startswith("sdk/"):
-                    cdn_url = f"https://unpkg.com/amis@6.13.0/{relative_path}"
-                else:
-                    cdn_url = f"https://unpkg.com/amis@6.13.0/sdk/{relative_path}"
-                
-                logger.info(f"Fetching {relative_path} from CDN: {cdn_url}")
-                
-                # 从CDN获取文件
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.get(cdn_url)
-                    if response.status_code == 200:
-                        # 获取正确的MIME类型
-                        media_type = response.headers.get("content-type", "")
-                        if not media_type:
-                            # 如果没有提供，根据扩展名设置默认值
-                            if relative_path.endswith(".css"):
-                                media_type = "text/css"
-                            elif relative_path.endswith(".js"):
-                                media_type = "application/javascript"
-                            elif relative_path.endswith(".woff2"):
-                                media_type = "font/woff2"
-                            elif relative_path.endswith(".woff"):
-                                media_type = "font/woff"
-                            elif relative_path.endswith(".ttf"):
-                                media_type = "font/ttf"
-                            elif relative_path.endswith(".svg"):
-                                media_type = "image/svg+xml"
-                            else:
-                                media_type = "application/octet-stream"
-                        
-                        # 设置适当的缓存头
-                        headers = {
-                            "Cache-Control": "public, max-age=86400",  # 缓存1天
-                            "Access-Control-Allow-Origin": "*",
-                        }
-                        
-                        return Response(content=response.content, media_type=media_type, headers=headers)
-                    else:
-                        logger.warning(f"CDN returned {response.status_code} for {cdn_url}")
-            except Exception as e:
-                logger.error(f"Failed to fetch {relative_path} from CDN: {e}")
+            # 如果本地文件不存在，尝试从CDN获取（带内存和磁盘缓存）
+            cdn_resource = await fetch_amis_from_cdn(relative_path)
+            if cdn_resource is not None:
+                content, media_type = cdn_resource
+                return Response(content=content, media_type=media_type, headers=AMIS_RESPONSE_HEADERS)
     
     # 如果不是Amis资源请求或文件不存在，继续处理
     response = await call_next(request)
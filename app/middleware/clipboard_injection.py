@@ -1,34 +1,108 @@
-from fastapi import Request, Response
-from fastapi.responses import HTMLResponse
-import re
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def clipboard_script_injection_middleware(request: Request, call_next):
-    """剪贴板脚本注入中间件 - 将clipboard-handler.js注入到admin页面"""
-    response = await call_next(request)
-
-    if isinstance(response, HTMLResponse):
-        content = response.body.decode('utf-8')
-
-        if '/static/amis/' in content or 'amis-page' in content or 'amis-admin' in content:
-            clipboard_script = '''<script src="/static/js/clipboard-handler.js"></script>
+# 注入到admin页面的剪贴板脚本
+CLIPBOARD_SCRIPT = '''<script src="/static/js/clipboard-handler.js"></script>
 <script>
 document.addEventListener('DOMContentLoaded', function() {
     console.log('剪贴板复制处理器已加载 - Clipboard handler initialized');
 });
 </script>
-'''
-
-            if '/static/js/clipboard-handler.js' not in content:
-                if '</head>' in content:
-                    content = content.replace('</head>', f'{clipboard_script}</head>')
-                    response.body = content.encode('utf-8')
-                    logger.debug('已将clipboard-handler.js注入到admin页面')
-                elif '</body>' in content:
-                    content = content.replace('</body>', f'{clipboard_script}</body>')
-                    response.body = content.encode('utf-8')
-                    logger.debug('已将clipboard-handler.js注入到admin页面')
-
-    return response
+'''.encode('utf-8')
+
+# 已注入脚本的标记
+_CLIPBOARD_SCRIPT_MARKER = b'/static/js/clipboard-handler.js'
+# 除admin页面外可能需要注入的页面路径，其他路径（接口、静态文件等）直接透传
+_PAGE_PATHS = frozenset(('/', '/login'))
+# amis页面的标记
+_AMIS_PAGE_MARKERS = (b'/static/amis/', b'amis-page', b'amis-admin')
+
+_HEAD_END = b'</head>'
+_BODY_END = b'</body>'
+
+
+class ClipboardScriptInjectionMiddleware:
+    """
+    剪贴板脚本注入中间件 - 将clipboard-handler.js注入到admin页面
+
+    以ASGI中间件的方式包装send，只缓冲页面路径下未压缩的HTML响应；
+    amis页面的标记可能在</head>之后，因此在整个页面中查找标记，脚本仍注入到</head>前。
+    """
+
+    def __init__(self, app: ASGIApp, admin_path: str = "/admin") -> None:
+        self.app = app
+        self.admin_path = admin_path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._is_page_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _ClipboardScriptInjector(send).send)
+
+    def _is_page_path(self, path: str) -> bool:
+        return path in _PAGE_PATHS or path.startswith(self.admin_path)
+
+
+class _ClipboardScriptInjector:
+    """单个响应的脚本注入状态"""
+
+    def __init__(self, send: Send) -> None:
+        self._send = send
+        self._start_message: Optional[Message] = None
+        self._buffer = bytearray()
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            # 只处理未压缩的HTML响应
+            if not headers.get("content-type", "").startswith("text/html") or "content-encoding" in headers:
+                self._passthrough = True
+                await self._send(message)
+                return
+            self._start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        self._buffer += message.get("body", b"")
+        if message.get("more_body", False):
+            return
+
+        # amis页面的标记可能出现在</head>之后（如页面底部的JSON配置），需要在整个页面中查找
+        index = self._buffer.find(_HEAD_END)
+        if index < 0:
+            # 没有</head>时退回到</body>前注入
+            index = self._buffer.find(_BODY_END)
+        if index >= 0 and self._should_inject(self._buffer):
+            self._buffer[index:index] = CLIPBOARD_SCRIPT
+            headers = MutableHeaders(raw=self._start_message["headers"])
+            if "content-length" in headers:
+                headers["content-length"] = str(int(headers["content-length"]) + len(CLIPBOARD_SCRIPT))
+            logger.debug('已将clipboard-handler.js注入到admin页面')
+        await self._flush()
+
+    @staticmethod
+    def _should_inject(content: bytearray) -> bool:
+        """在整个页面中查找标记（直接在缓冲区上按字节查找，不复制）"""
+        if content.find(_CLIPBOARD_SCRIPT_MARKER) >= 0:
+            return False
+        return any(content.find(marker) >= 0 for marker in _AMIS_PAGE_MARKERS)
+
+    async def _flush(self) -> None:
+        """发送响应头和缓冲的完整响应体"""
+        self._passthrough = True
+        await self._send(self._start_message)
+        await self._send({"type": "http.response.body", "body": bytes(self._buffer), "more_body": False})
+        self._buffer = bytearray()
@@ -1,150 +1,159 @@
 from fastapi import Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+import importlib.util
 import logging
-import traceback
-import time
+from time import perf_counter, perf_counter_ns
 from typing import Callable, Any
 import json
 
 logger = logging.getLogger(__name__)
 
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+# 安装了orjson时错误响应用ORJSONResponse序列化，否则退回标准库json
+ErrorResponseClass = ORJSONResponse if importlib.util.find_spec("orjson") else JSONResponse
+
+# 500错误响应的固定响应头（模块加载时构建一次，各错误响应共用）
+_ERROR_HEADERS = {
+    "Content-Type": "application/json",
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0"
+}
+
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+class ErrorHandlingMiddleware:
+    """
+    增强的错误处理中间件
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    """增强的错误处理中间件"""
+    以纯ASGI中间件实现（不继承BaseHTTPMiddleware），避免每个请求额外创建任务组和内存流；
+    通过包装send获取响应状态码用于日志。
+    """
     
-    def __init__(self, app):
-        super().__init__(app)
-        self.request_start_time = {}
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
     
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """处理请求并捕获错误"""
-        request_id = id(request)
-        start_time = time.time()
-        self.request_start_time[request_id] = start_time
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        # 请求ID（十六进制字符串，用于关联日志和错误响应）
+        request_id = f"{perf_counter_ns():x}"
+        # 开始时间和请求ID记录在请求自身上（即request.state），不再维护进程级字典
+        state = scope.setdefault("state", {})
+        state["start_time"] = start_time
+        state["request_id"] = request_id
+        status_code = None
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
         
         try:
             # 记录请求开始
-            logger.info(f"开始处理请求 - {request.method} {request.url.path}")
+            logger.info("开始处理请求 - %s %s", method, path)
             
             # 处理请求
-            response = await call_next(request)
-            
-            # 记录响应时间和状态
-            duration = time.time() - start_time
-            
-            # 记录4xx和5xx错误请求的详细信息
-            if response.status_code >= 400:
-                try:
-                    # 尝试读取请求体用于调试（只在非400错误时读取）
-                    body_str = "无请求体"
-                    if response.status_code != 400:
-                        try:
-                            body = await request.body()
-                            body_str = body.decode('utf-8') if body else "无请求体"
-                        except Exception:
-                            body_str = "无法读取请求体"
-                except Exception:
-                    body_str = "无法读取请求体"
-                
-                logger.warning(f"请求错误 - {request.method} {request.url.path} - 状态码: {response.status_code} - 耗时: {duration:.2f}ms - 请求体: {body_str[:500]}")
-            else:
-                logger.info(f"请求完成 - {request.method} {request.url.path} - 状态码: {response.status_code} - 耗时: {duration:.2f}ms")
-            
-            return response
+            await self.app(scope, receive, send_wrapper)
             
         except Exception as e:
             # 捕获所有未处理的异常
-            duration = time.time() - start_time
-            logger.error(f"请求失败 - {request.method} {request.url.path} - 耗时: {duration:.2f}ms")
-            logger.error(f"错误详情: {str(e)}")
-            logger.error(f"错误堆栈: {traceback.format_exc()}")
+            duration = (perf_counter() - start_time) * 1000
+            logger.exception("请求失败 - %s %s - 请求ID: %s - 耗时: %.2fms - %s", method, path, request_id, duration, e)
+            
+            # 响应已经开始发送时无法再返回错误响应，交给服务器处理
+            if status_code is not None:
+                raise
             
             # 返回友好的错误响应
             error_response = {
                 "status": 1,
                 "msg": f"服务器内部错误: {str(e)}",
                 "data": None,
-                "error_type": type(e).__name__,
-                "request_id": str(request_id),
-                "path": request.url.path,
-                "method": request.method
+                "error_type": e.__class__.__name__,
+                "request_id": request_id,
+                "path": path,
+                "method": method
             }
             
-            return JSONResponse(
+            response = ErrorResponseClass(
                 status_code=500,
                 content=error_response,
-                headers={
-                    "Content-Type": "application/json",
-                    "Cache-Control": "no-cache, no-store, must-revalidate",
-                    "Pragma": "no-cache",
-                    "Expires": "0"
-                }
+                headers=_ERROR_HEADERS
             )
+            await response(scope, receive, send)
+            return
         
-        finally:
-            # 清理请求时间记录
-            if request_id in self.request_start_time:
-                del self.request_start_time[request_id]
+        # 记录响应时间和状态
+        duration = (perf_counter() - start_time) * 1000
+        
+        # 记录4xx和5xx错误请求（请求体此时已被路由读取，不再重复读取）
+        if status_code is not None and status_code >= 400:
+            logger.warning("请求错误 - %s %s - 状态码: %s - 耗时: %.2fms", method, path, status_code, duration)
+        else:
+            logger.info("请求完成 - %s %s - 状态码: %s - 耗时: %.2fms", method, path, status_code, duration)
 
 async def log_request_middleware(request: Request, call_next: Callable) -> Response:
     """请求日志中间件"""
-    start_time = time.time()
+    start_time = perf_counter()
+    method = request.method
+    path = request.url.path
     
     # 记录请求开始
-    logger.info(f"开始处理请求 - {request.method} {request.url.path}")
+    logger.info("开始处理请求 - %s %s", method, path)
     
     try:
         response = await call_next(request)
         
         # 记录响应
-        duration = time.time() - start_time
-        logger.info(f"请求完成 - {request.method} {request.url.path} - 状态码: {response.status_code} - 耗时: {duration:.2f}ms")
+        duration = (perf_counter() - start_time) * 1000
+        logger.info("请求完成 - %s %s - 状态码: %s - 耗时: %.2fms", method, path, response.status_code, duration)
         
         return response
         
     except Exception as e:
-        duration = time.time() - start_time
-        logger.error(f"请求失败 - {request.method} {request.url.path} - 耗时: {duration:.2f}ms")
-        logger.error(f"错误详情: {str(e)}")
-        logger.error(f"错误堆栈: {traceback.format_exc()}")
+        duration = (perf_counter() - start_time) * 1000
+        logger.exception("请求失败 - %s %s - 耗时: %.2fms - %s", method, path, duration, e)
         
         # 重新抛出异常让错误处理中间件处理
         raise
 
-async def chunked_encoding_fix_middleware(request: Request, call_next: Callable) -> Response:
-    """修复chunked编码问题的中间件"""
-    try:
-        response = await call_next(request)
-        
-        # 确保响应有正确的Content-Length头
-        if hasattr(response, 'body') and response.body:
-            content_length = len(response.body)
-            response.headers['Content-Length'] = str(content_length)
-        
-        # 设置适当的缓存和连接头
-        response.headers['Connection'] = 'keep-alive'
-        response.headers['Keep-Alive'] = 'timeout=5, max=100'
-        
-        return response
-        
-    except Exception as e:
-        logger.error(f"Chunked编码中间件错误: {str(e)}")
-        raise
+# 预检请求的响应头（模块加载时构建一次）
+CORS_PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With',
+    'Access-Control-Allow-Credentials': 'true',
+    # 浏览器缓存预检结果10分钟，期间相同的跨域请求不再发送OPTIONS
+    'Access-Control-Max-Age': '600',
+}
+# 普通请求追加的CORS头（预先编码）
+_CORS_RAW_HEADERS = (
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-credentials', b'true'),
+)
+_CORS_RAW_HEADER_NAMES = frozenset(name for name, _ in _CORS_RAW_HEADERS)
 
 async def cors_middleware(request: Request, call_next: Callable) -> Response:
     """CORS中间件"""
-    response = await call_next(request)
+    # 预检请求直接返回，不再进入后续中间件和路由
+    if request.method == 'OPTIONS':
+        return Response(status_code=204, headers=CORS_PREFLIGHT_HEADERS)
     
-    # 添加CORS头
-    response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
-    response.headers['Access-Control-Allow-Credentials'] = 'true'
+    response = await call_next(request)
     
-    # 处理预检请求
-    if request.method == 'OPTIONS':
-        return Response(status_code=200, headers=response.headers)
+    # 普通请求只需要Origin和Credentials头，Methods/Headers只对预检请求有意义；
+    # 先移除路由或CORSMiddleware已设置的同名头，避免重复的Access-Control-Allow-Origin被浏览器拒绝
+    response.raw_headers[:] = [
+        header for header in response.raw_headers if header[0] not in _CORS_RAW_HEADER_NAMES
+    ]
+    response.raw_headers.extend(_CORS_RAW_HEADERS)
     
-    return response
\ No newline at end of file
+    return response
@@ -5,16 +5,35 @@ Token验证和fetch拦截器中间件
 """
 
 import re
-from typing import Callable
-from fastapi import Request, Response
-from fastapi.responses import HTMLResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 
 logger = logging.getLogger(__name__)
 
-class TokenVerificationMiddleware(BaseHTTPMiddleware):
-    """令牌验证和脚本注入中间件"""
+# 只占一整行的console.log调用
+_CONSOLE_LOG_LINE_RE = re.compile(r"console\.log\(.*\);$")
+
+
+def _minify_script(script: str) -> str:
+    """简单压缩注入脚本：去掉缩进、空行、整行注释和console.log调用（保留换行，避免影响JS自动补分号）"""
+    lines = []
+    for line in script.splitlines():
+        line = line.strip()
+        if not line or line.startswith('//') or _CONSOLE_LOG_LINE_RE.match(line):
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+class TokenVerificationMiddleware:
+    """
+    令牌验证和脚本注入中间件
+
+    以ASGI中间件的方式包装send（BaseHTTPMiddleware的call_next返回的是流式响应，无法直接读取HTML），
+    缓冲admin路径下未压缩的HTML响应，在</body>前注入令牌验证脚本；页面已包含verifyAndSetToken时不再注入。
+    """
 
     # 注入的脚本内容
     TOKEN_SCRIPT = '''
@@ -93,53 +112,78 @@ class TokenVerificationMiddleware(BaseHTTPMiddleware):
     })();
     </script>
     '''
+    # 压缩并预先编码的脚本和标记（模块加载时处理一次），注入时直接在响应体字节上操作，不再解码/重新编码整个页面
+    TOKEN_SCRIPT_BYTES = _minify_script(TOKEN_SCRIPT).encode('utf-8')
+    MARKER = b'verifyAndSetToken'
+    # 在插入位置之前多大范围内查找已注入的脚本
+    MARKER_SEARCH_WINDOW = 8192
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """拦截响应并注入脚本"""
-        logger.info(f"[Token Middleware] 拦截请求: {request.method} {request.url.path}")
-        
-        # 只对HTML响应进行处理
-        response = await call_next(request)
-        
-        # 检查是否为HTML响应且是admin页面
-        logger.info(f"[Token Middleware] 检查响应类型: {type(response)}, 路径: {request.url.path}")
-        
-        if (isinstance(response, HTMLResponse) and 
-            '/admin' in str(request.url.path) and
-            response.headers.get('content-type', '').startswith('text/html')):
-            
-            try:
-                # 获取原始HTML内容
-                html_content = response.body.decode('utf-8')
-                logger.info(f"[Token Middleware] 正在处理HTML响应，路径: {request.url.path}")
-                
-                # 检查是否已经有我们的脚本（避免重复注入）
-                if 'verifyAndSetToken' not in html_content:
-                    # 在</body>标签之前插入脚本
-                    if '</body>' in html_content:
-                        modified_html = html_content.replace('</body>', self.TOKEN_SCRIPT + '</body>')
-                    elif '</html>' in html_content:
-                        # 如果没有</body>标签，在</html>前插入
-                        modified_html = html_content.replace('</html>', self.TOKEN_SCRIPT + '</html>')
-                    else:
-                        # 如果都没有，在内容末尾添加
-                        modified_html = html_content + self.TOKEN_SCRIPT
-                    
-                    # 创建新的HTML响应
-                    new_response = HTMLResponse(content=modified_html)
-                    
-                    # 复制原响应的头部信息
-                    for key, value in response.headers.items():
-                        new_response.headers[key] = value
-                    
-                    logger.info(f"[Token Middleware] 脚本注入成功，路径: {request.url.path}")
-                    return new_response
-                else:
-                    logger.info(f"[Token Middleware] 脚本已存在，跳过注入，路径: {request.url.path}")
-                    
-            except Exception as e:
-                logger.error(f"[Token Middleware] 脚本注入失败: {e}")
-                # 注入失败时返回原始响应
-                return response
-        
-        return response
\ No newline at end of file
+    def __init__(self, app: ASGIApp, admin_path: str = "/admin") -> None:
+        self.app = app
+        self.admin_path = admin_path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 非admin路径不需要注入，直接透传
+        if scope["type"] != "http" or not scope["path"].startswith(self.admin_path):
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _TokenScriptInjector(send, scope["path"]).send)
+
+
+class _TokenScriptInjector:
+    """单个响应的脚本注入状态"""
+
+    def __init__(self, send: Send, path: str) -> None:
+        self._send = send
+        self._path = path
+        self._start_message: Optional[Message] = None
+        self._buffer = bytearray()
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            # 只处理未压缩的HTML响应
+            if not headers.get("content-type", "").startswith("text/html") or "content-encoding" in headers:
+                self._passthrough = True
+                await self._send(message)
+                return
+            self._start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        # 脚本插入在</body>之前，需要缓冲整个页面
+        self._buffer += message.get("body", b"")
+        if message.get("more_body", False):
+            return
+
+        body = self._buffer
+        # 在</body>标签之前插入脚本，没有时在</html>前插入，都没有则追加到末尾
+        index = body.rfind(b'</body>')
+        if index < 0:
+            index = body.rfind(b'</html>')
+        if index < 0:
+            index = len(body)
+
+        # 已注入的脚本（包括admin页面自带的）都紧挨在插入位置之前，只在其前面一段范围内查找，
+        # 不扫描整个页面；没有结束标签时退回到全文查找
+        search_from = max(index - TokenVerificationMiddleware.MARKER_SEARCH_WINDOW, 0) if index < len(body) else 0
+        if body.find(TokenVerificationMiddleware.MARKER, search_from, index) < 0:
+            body[index:index] = TokenVerificationMiddleware.TOKEN_SCRIPT_BYTES
+            headers = MutableHeaders(raw=self._start_message["headers"])
+            if "content-length" in headers:
+                headers["content-length"] = str(len(body))
+            logger.info("[Token Middleware] 脚本注入成功，路径: %s", self._path)
+        else:
+            logger.debug("[Token Middleware] 脚本已存在，跳过注入，路径: %s", self._path)
+
+        self._passthrough = True
+        await self._send(self._start_message)
+        await self._send({"type": "http.response.body", "body": bytes(body), "more_body": False})
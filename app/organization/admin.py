@@ -5,6 +5,7 @@ try:
     from fastapi_amis_admin.models.fields import Field
     from fastapi_amis_admin.amis import PageSchema
     from fastapi_amis_admin.crud.schema import ItemListSchema
+    from fastapi_amis_admin.crud.parser import LabelField
     from fastapi_amis_admin.amis.components import Action, ActionType, Dialog, Form
 except ImportError:
     import sys
@@ -14,6 +15,7 @@ except ImportError:
     from fastapi_amis_admin.models.fields import Field
     from fastapi_amis_admin.amis import PageSchema
     from fastapi_amis_admin.crud.schema import ItemListSchema
+    from fastapi_amis_admin.crud.parser import LabelField
     from fastapi_amis_admin.amis.components import Action, ActionType, Dialog, Form
 
 from sqlalchemy import select, func
@@ -21,23 +23,72 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models.organization import Organization, OrganizationRole
 from .models.person import Person, PersonRoleLink, PersonDepartmentHistory
-from ..core.db import get_async_db
+from ..core.auth import ROLE_SUPERUSER, get_role_mask
+from ..core.db import get_request_db
 from ..utils.clipboard_integration import ClipboardCopyMixin
-from .schemas.person_import import PersonBatchImportRequest, PersonBatchImportResult
+from .schemas.person_import import PersonBatchImportRequest, PersonBatchImportResult, PersonImportItem
 from .services.person_import_service import PersonImportService
 
+# 列表中显示的关联名称在列表查询中通过外连接直接取出，同一张表多次关联时用别名区分。
+# 使用表级别名而不是ORM的aliased()：后者会在导入时触发映射配置，此时其他模块的模型（如User）可能尚未加载
+ParentOrganization = Organization.__table__.alias("parent_organization")
+LeaderPerson = Person.__table__.alias("leader_person")
+FromOrganization = Organization.__table__.alias("from_organization")
+ToOrganization = Organization.__table__.alias("to_organization")
+
 
 async def get_user_from_request(request: Request) -> Optional[dict]:
     """从请求中获取当前用户信息"""
-    try:
-        if hasattr(request.state, 'user') and request.state.user:
-            return request.state.user
-        return None
-    except:
-        return None
+    user = getattr(request.state, 'user', None)
+    return user if user else None
+
+
+async def _get_role_mask(request: Request) -> int:
+    """获取当前用户的角色标记位，优先使用认证中间件写入的request.state.role_mask，没有时按用户信息计算一次并缓存"""
+    role_mask = getattr(request.state, 'role_mask', None)
+    if role_mask is None:
+        role_mask = get_role_mask(await get_user_from_request(request))
+        request.state.role_mask = role_mask
+    return role_mask
+
+
+class RoleGatedMixin:
+    """
+    按角色控制增删改查权限的混入类，放在ModelAdmin之前继承。
+
+    required_roles 指定各操作需要的角色：superuser - 仅超级管理员；staff - 职员或超级管理员。
+    """
+    required_roles = {
+        "create": "superuser",
+        "delete": "superuser",
+        "update": "superuser",
+        "list": "staff",
+        "read": "staff",
+    }
+
+    async def _has_required_role(self, request: Request, action: str) -> bool:
+        role_mask = await _get_role_mask(request)
+        if self.required_roles[action] == "superuser":
+            return bool(role_mask & ROLE_SUPERUSER)
+        return bool(role_mask)
+
+    async def has_create_permission(self, request: Request, data=None, **kwargs) -> bool:
+        return await self._has_required_role(request, "create")
+
+    async def has_delete_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
+        return await self._has_required_role(request, "delete")
 
+    async def has_list_permission(self, request: Request, paginator, filters=None, **kwargs) -> bool:
+        return await self._has_required_role(request, "list")
+
+    async def has_read_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
+        return await self._has_required_role(request, "read")
+
+    async def has_update_permission(self, request: Request, item_id: List[str], data=None, **kwargs) -> bool:
+        return await self._has_required_role(request, "update")
 
-class OrganizationAdmin(ClipboardCopyMixin, ModelAdmin):
+
+class OrganizationAdmin(RoleGatedMixin, ClipboardCopyMixin, ModelAdmin):
     page_schema = PageSchema(label="组织管理", icon="fa fa-sitemap")
     model = Organization
 
@@ -51,23 +102,22 @@ class OrganizationAdmin(ClipboardCopyMixin, ModelAdmin):
         Organization.code,
         Organization.type,
         Organization.level,
-        "parent_name",
-        "leader_name",
+        LabelField(ParentOrganization.c.name.label("parent_name"), Field(None, title="上级组织")),
+        LabelField(LeaderPerson.c.name.label("leader_name"), Field(None, title="负责人")),
         Organization.phone,
         Organization.email,
         Organization.is_active,
         Organization.created_at,
     ]
     
-    async def get_list(self, request):
-        """获取列表数据，关联上级组织和负责人信息"""
-        from sqlalchemy.orm import selectinload
-        
-        stmt = select(self.model).options(
-            selectinload(self.model.parent),
-            selectinload(self.model.leader)
+    async def get_select(self, request: Request):
+        """列表查询，外连接上级组织和负责人，名称在同一条查询中取出"""
+        stmt = await super().get_select(request)
+        return stmt.outerjoin(
+            ParentOrganization, Organization.parent_id == ParentOrganization.c.id
+        ).outerjoin(
+            LeaderPerson, Organization.leader_id == LeaderPerson.c.id
         )
-        return await self.schema_list_from_stmt(request, stmt)
 
     form_fields = [
         Organization.name,
@@ -82,99 +132,32 @@ class OrganizationAdmin(ClipboardCopyMixin, ModelAdmin):
         Organization.is_active,
     ]
 
-    async def has_create_permission(self, request: Request, data=None, **kwargs) -> bool:
-        """只允许 admin 用户创建组织"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
-    async def has_delete_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
-        """只允许 admin 用户删除组织"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
-    async def has_list_permission(self, request: Request, paginator, filters=None, **kwargs) -> bool:
-        """只允许 admin 或 staff 用户查看组织列表"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_staff", False) or current_user.get("is_superuser", False)
-
-    async def has_read_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
-        """只允许 admin 或 staff 用户查看组织详情"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_staff", False) or current_user.get("is_superuser", False)
-
-    async def has_update_permission(self, request: Request, item_id: List[str], data=None, **kwargs) -> bool:
-        """只允许 admin 用户更新组织"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
     async def on_list_after(self, request: Request, result, data: ItemListSchema, **kwargs):
         """列表查询后处理，添加子组织数量"""
         data = await super().on_list_after(request, result, data, **kwargs)
-        async for db in get_async_db():
-            for item in data.items:
-                org_id = getattr(item, 'id', None)
-                
-                if org_id:
-                    child_count_result = await db.execute(
-                        select(func.count()).select_from(Organization).where(Organization.parent_id == org_id)
-                    )
-                    item.child_count = child_count_result.scalar() or 0
-                
-                if hasattr(item, 'leader') and item.leader:
-                    leader_name = getattr(item.leader, 'name', '')
-                    item.leader_name = leader_name
-                else:
-                    item.leader_name = ""
-                
-                if hasattr(item, 'parent') and item.parent:
-                    parent_name = getattr(item.parent, 'name', '')
-                    item.parent_name = parent_name
-                else:
-                    item.parent_name = ""
-        return data
-
-    async def on_create_before(self, request: Request, data: dict, **kwargs):
-        """创建组织前处理，自动计算层级"""
-        parent_id = data.get("parent_id")
-        if parent_id:
-            async for db in get_async_db():
-                result = await db.execute(select(Organization).where(Organization.id == parent_id))
-                parent_org = result.scalar_one_or_none()
-                if parent_org:
-                    data["level"] = parent_org.level + 1
-                else:
-                    data["level"] = 1
-        else:
-            data["level"] = 1
-        return data
-
-    async def on_update_before(self, request: Request, data: dict, **kwargs):
-        """更新组织前处理，重新计算层级"""
-        parent_id = data.get("parent_id")
-        if parent_id:
-            async for db in get_async_db():
-                result = await db.execute(select(Organization).where(Organization.id == parent_id))
-                parent_org = result.scalar_one_or_none()
-                if parent_org:
-                    data["level"] = parent_org.level + 1
-                else:
-                    data["level"] = 1
-        else:
-            data["level"] = 1
+        if not data.items:
+            return data
+        # 一次分组查询取得本页所有组织的子组织数量，避免逐条查询
+        # 每条记录只取一次id，查询和回填共用
+        item_ids = [getattr(item, 'id', None) for item in data.items]
+        org_ids = [org_id for org_id in item_ids if org_id]
+        child_counts = {}
+        if org_ids:
+            db = await get_request_db(request)
+            child_count_result = await db.execute(
+                select(Organization.parent_id, func.count())
+                .where(Organization.parent_id.in_(org_ids))
+                .group_by(Organization.parent_id)
+            )
+            child_counts = dict(child_count_result.all())
+        
+        for item, org_id in zip(data.items, item_ids):
+            if org_id:
+                item.child_count = child_counts.get(org_id, 0)
         return data
 
 
-class OrganizationRoleAdmin(ClipboardCopyMixin, ModelAdmin):
+class OrganizationRoleAdmin(RoleGatedMixin, ClipboardCopyMixin, ModelAdmin):
     page_schema = PageSchema(label="组织角色", icon="fa fa-user-tag")
     model = OrganizationRole
 
@@ -199,43 +182,96 @@ class OrganizationRoleAdmin(ClipboardCopyMixin, ModelAdmin):
         OrganizationRole.is_active,
     ]
 
-    async def has_create_permission(self, request: Request, data=None, **kwargs) -> bool:
-        """只允许 admin 用户创建角色"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
 
-    async def has_delete_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
-        """只允许 admin 用户删除角色"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
-    async def has_list_permission(self, request: Request, paginator, filters=None, **kwargs) -> bool:
-        """只允许 admin 或 staff 用户查看角色列表"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_staff", False) or current_user.get("is_superuser", False)
-
-    async def has_read_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
-        """只允许 admin 或 staff 用户查看角色详情"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_staff", False) or current_user.get("is_superuser", False)
-
-    async def has_update_permission(self, request: Request, item_id: List[str], data=None, **kwargs) -> bool:
-        """只允许 admin 用户更新角色"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
+def _read_person_import_items(file_obj) -> List[PersonImportItem]:
+    """
+    以只读模式逐行读取Excel（第一行为表头），每行直接构造PersonImportItem，
+    不再先把整个文件读入内存、构建DataFrame再转换为字典列表。无法解析的行跳过。
+    """
+    import openpyxl
+    
+    workbook = openpyxl.load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows, None)
+        if not headers:
+            return []
+        headers = [str(header) if header is not None else None for header in headers]
+        
+        import_data = []
+        for row in rows:
+            # 跳过空行
+            if all(value is None for value in row):
+                continue
+            try:
+                import_data.append(PersonImportItem(**{
+                    header: value for header, value in zip(headers, row) if header is not None
+                }))
+            except Exception:
+                continue
+        return import_data
+    finally:
+        workbook.close()
+
+
+# 批量导入对话框是静态配置，类加载时构建一次，admin_action_maker中直接引用
+_BATCH_IMPORT_ACTION = Action(
+    actionType='dialog',
+    dialog={
+        "title": "批量导入人员",
+        "size": "md",
+        "body": {
+            "type": "form",
+            "mode": "normal",
+            "controls": [
+                {
+                    "type": "input-file",
+                    "name": "file",
+                    "label": "选择Excel文件",
+                    "accept": ".xlsx",
+                    "required": True,
+                    "asBlob": True,
+                    "description": "请上传包含人员数据的Excel文件，仅支持.xlsx格式"
+                },
+                {
+                    "type": "divider"
+                },
+                {
+                    "type": "tpl",
+                    "tpl": "<a href=\"/api/batch-import/download/person\" target=\"_blank\" style=\"color: #1890ff;\">下载导入模板</a>",
+                    "className": "mb-2"
+                },
+                {
+                    "type": "tpl",
+                    "tpl": "<div style=\"background: #f5f5f5; padding: 10px; border-radius: 4px; margin-top: 10px;\"><strong>导入说明：</strong><br/>1. 第一行为表头，从第二行开始为数据<br/>2. 必填字段：姓名、人员编码<br/>3. 支持的最大导入数量：1000条<br/>4. 人员编码必须唯一，重复将根据导入模式处理</div>",
+                    "className": "mb-2"
+                }
+            ]
+        },
+        "actions": [
+            {
+                "type": "button",
+                "actionType": "cancel",
+                "label": "取消"
+            },
+            {
+                "type": "submit",
+                "label": "开始导入",
+                "level": "primary",
+                "api": {
+                    "method": "post",
+                    "url": "/api/batch-import/import/person/form",
+                    "data": {
+                        "file": "${file}"
+                    }
+                }
+            }
+        ]
+    }
+)
 
 
-class PersonAdmin(ClipboardCopyMixin, ModelAdmin):
+class PersonAdmin(RoleGatedMixin, ClipboardCopyMixin, ModelAdmin):
     page_schema = PageSchema(label="人员管理", icon="fa fa-users")
     model = Person
 
@@ -247,7 +283,7 @@ class PersonAdmin(ClipboardCopyMixin, ModelAdmin):
         Person.id,
         Person.name,
         Person.code,
-        "organization_name",
+        LabelField(Organization.name.label("organization_name"), Field(None, title="所属组织")),
         Person.position,
         Person.job_level,
         Person.gender,
@@ -258,14 +294,10 @@ class PersonAdmin(ClipboardCopyMixin, ModelAdmin):
         Person.created_at,
     ]
     
-    async def get_list(self, request):
-        """获取列表数据，关联组织信息"""
-        from sqlalchemy.orm import selectinload
-        
-        stmt = select(self.model).options(
-            selectinload(self.model.organization)
-        )
-        return await self.schema_list_from_stmt(request, stmt)
+    async def get_select(self, request: Request):
+        """列表查询，外连接所属组织，组织名称在同一条查询中取出"""
+        stmt = await super().get_select(request)
+        return stmt.outerjoin(Organization, Person.organization_id == Organization.id)
 
     form_fields = [
         Person.name,
@@ -303,124 +335,16 @@ class PersonAdmin(ClipboardCopyMixin, ModelAdmin):
             name='batch_import',
             label='批量导入',
             icon='fa fa-file-import',
-            action=Action(
-                actionType='dialog',
-                dialog={
-                    "title": "批量导入人员",
-                    "size": "md",
-                    "body": {
-                        "type": "form",
-                        "mode": "normal",
-                        "controls": [
-                            {
-                                "type": "input-file",
-                                "name": "file",
-                                "label": "选择Excel文件",
-                                "accept": ".xlsx,.xls",
-                                "required": True,
-                                "asBlob": True,
-                                "description": "请上传包含人员数据的Excel文件，支持.xlsx和.xls格式"
-                            },
-                            {
-                                "type": "divider"
-                            },
-                            {
-                                "type": "tpl",
-                                "tpl": "<a href=\"/api/batch-import/download/person\" target=\"_blank\" style=\"color: #1890ff;\">下载导入模板</a>",
-                                "className": "mb-2"
-                            },
-                            {
-                                "type": "tpl",
-                                "tpl": "<div style=\"background: #f5f5f5; padding: 10px; border-radius: 4px; margin-top: 10px;\"><strong>导入说明：</strong><br/>1. 第一行为表头，从第二行开始为数据<br/>2. 必填字段：姓名、人员编码<br/>3. 支持的最大导入数量：1000条<br/>4. 人员编码必须唯一，重复将根据导入模式处理</div>",
-                                "className": "mb-2"
-                            }
-                        ]
-                    },
-                    "actions": [
-                        {
-                            "type": "button",
-                            "actionType": "cancel",
-                            "label": "取消"
-                        },
-                        {
-                            "type": "submit",
-                            "label": "开始导入",
-                            "level": "primary",
-                            "api": {
-                                "method": "post",
-                                "url": "/api/batch-import/import/person/form",
-                                "data": {
-                                    "file": "${file}"
-                                }
-                            }
-                        }
-                    ]
-                }
-            ),
+            action=_BATCH_IMPORT_ACTION,
             flags=['toolbar']
         )
     ]
 
-    async def has_create_permission(self, request: Request, data=None, **kwargs) -> bool:
-        """只允许 admin 用户创建人员"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
-    async def has_delete_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
-        """只允许 admin 用户删除人员"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
-    async def has_list_permission(self, request: Request, paginator, filters=None, **kwargs) -> bool:
-        """只允许 admin 或 staff 用户查看人员列表"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_staff", False) or current_user.get("is_superuser", False)
-
-    async def has_read_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
-        """只允许 admin 或 staff 用户查看人员详情"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_staff", False) or current_user.get("is_superuser", False)
-
-    async def has_update_permission(self, request: Request, item_id: List[str], data=None, **kwargs) -> bool:
-        """只允许 admin 用户更新人员"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
-    async def on_list_after(self, request: Request, result, data: ItemListSchema, **kwargs):
-        """列表查询后处理，添加组织和用户信息"""
-        data = await super().on_list_after(request, result, data, **kwargs)
-        
-        for item in data.items:
-            if hasattr(item, 'organization') and item.organization:
-                org_name = getattr(item.organization, 'name', '')
-                item.organization_name = org_name
-            else:
-                item.organization_name = ""
-            
-            if hasattr(item, 'user') and item.user:
-                username = getattr(item.user, 'username', '')
-                item.username = username
-            else:
-                item.username = ""
-        
-        return data
-
     async def batch_import(self, request: Request):
         """批量导入人员"""
         try:
             from fastapi import UploadFile, File, Form
-            import pandas as pd
-            import io
+            from starlette.concurrency import run_in_threadpool
             
             form = await request.form()
             file = form.get('file')
@@ -433,31 +357,17 @@ class PersonAdmin(ClipboardCopyMixin, ModelAdmin):
                     'message': '请上传Excel文件'
                 }
             
-            # 读取Excel文件
-            content = await file.read()
-            df = pd.read_excel(io.BytesIO(content))
-            
-            # 转换为字典列表
-            data = df.to_dict('records')
-            
-            # 转换为导入格式
-            from .schemas.person_import import PersonImportItem
-            import_data = []
-            for row in data:
-                try:
-                    import_item = PersonImportItem(**row)
-                    import_data.append(import_item)
-                except Exception as e:
-                    continue
+            # 读取Excel文件并转换为导入格式（在线程池中解析，不阻塞事件循环）
+            import_data = await run_in_threadpool(_read_person_import_items, file.file)
             
             # 执行导入
-            async for db in get_async_db():
-                service = PersonImportService(db)
-                result = await service.import_persons(
-                    data=import_data,
-                    import_mode=import_mode,
-                    skip_duplicates=skip_duplicates
-                )
+            db = await get_request_db(request)
+            service = PersonImportService(db)
+            result = await service.import_persons(
+                data=import_data,
+                import_mode=import_mode,
+                skip_duplicates=skip_duplicates
+            )
             
             return {
                 'status': 'success',
@@ -481,55 +391,30 @@ class PersonAdmin(ClipboardCopyMixin, ModelAdmin):
             }
 
 
-class PersonDepartmentHistoryAdmin(ModelAdmin):
+class PersonDepartmentHistoryAdmin(RoleGatedMixin, ModelAdmin):
     page_schema = PageSchema(label="部门调动历史", icon="fa fa-exchange-alt")
     model = PersonDepartmentHistory
 
     list_display = [
         PersonDepartmentHistory.id,
-        "person_name",
-        "from_organization_name",
-        "to_organization_name",
+        LabelField(Person.name.label("person_name"), Field(None, title="人员")),
+        LabelField(FromOrganization.c.name.label("from_organization_name"), Field(None, title="调出组织")),
+        LabelField(ToOrganization.c.name.label("to_organization_name"), Field(None, title="调入组织")),
         PersonDepartmentHistory.change_date,
         PersonDepartmentHistory.reason,
         PersonDepartmentHistory.created_by,
     ]
     
-    async def get_list(self, request):
-        """获取列表数据，关联人员和组织信息"""
-        from sqlalchemy.orm import selectinload
-        
-        stmt = select(self.model).options(
-            selectinload(self.model.person),
-            selectinload(self.model.from_organization),
-            selectinload(self.model.to_organization)
+    async def get_select(self, request: Request):
+        """列表查询，外连接人员、调出组织和调入组织，名称在同一条查询中取出"""
+        stmt = await super().get_select(request)
+        return stmt.outerjoin(
+            Person, PersonDepartmentHistory.person_id == Person.id
+        ).outerjoin(
+            FromOrganization, PersonDepartmentHistory.from_organization_id == FromOrganization.c.id
+        ).outerjoin(
+            ToOrganization, PersonDepartmentHistory.to_organization_id == ToOrganization.c.id
         )
-        return await self.schema_list_from_stmt(request, stmt)
-    
-    async def on_list_after(self, request: Request, result, data: ItemListSchema, **kwargs):
-        """列表查询后处理，添加人员和组织名称"""
-        data = await super().on_list_after(request, result, data, **kwargs)
-        
-        for item in data.items:
-            if hasattr(item, 'person') and item.person:
-                person_name = getattr(item.person, 'name', '')
-                item.person_name = person_name
-            else:
-                item.person_name = ""
-            
-            if hasattr(item, 'from_organization') and item.from_organization:
-                from_org_name = getattr(item.from_organization, 'name', '')
-                item.from_organization_name = from_org_name
-            else:
-                item.from_organization_name = ""
-            
-            if hasattr(item, 'to_organization') and item.to_organization:
-                to_org_name = getattr(item.to_organization, 'name', '')
-                item.to_organization_name = to_org_name
-            else:
-                item.to_organization_name = ""
-        
-        return data
 
     form_fields = [
         PersonDepartmentHistory.person_id,
@@ -539,38 +424,3 @@ class PersonDepartmentHistoryAdmin(ModelAdmin):
         PersonDepartmentHistory.reason,
         PersonDepartmentHistory.remark,
     ]
-
-    async def has_create_permission(self, request: Request, data=None, **kwargs) -> bool:
-        """只允许 admin 用户创建调动记录"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
-    async def has_delete_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
-        """只允许 admin 用户删除调动记录"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
-
-    async def has_list_permission(self, request: Request, paginator, filters=None, **kwargs) -> bool:
-        """只允许 admin 或 staff 用户查看调动记录"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_staff", False) or current_user.get("is_superuser", False)
-
-    async def has_read_permission(self, request: Request, item_id: List[str], **kwargs) -> bool:
-        """只允许 admin 或 staff 用户查看调动记录详情"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_staff", False) or current_user.get("is_superuser", False)
-
-    async def has_update_permission(self, request: Request, item_id: List[str], data=None, **kwargs) -> bool:
-        """只允许 admin 用户更新调动记录"""
-        current_user = await get_user_from_request(request)
-        if not current_user:
-            return False
-        return current_user.get("is_superuser", False)
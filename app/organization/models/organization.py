@@ -1,5 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index, DDL, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import remote
 from typing import Optional, List, TYPE_CHECKING
@@ -11,6 +11,12 @@ if TYPE_CHECKING:
 
 class Organization(SQLModel, table=True):
     __tablename__ = "organizations"
+    __table_args__ = (
+        # 按上级查询下级组织（子组织数量统计、children关系按sort_order排序）走同一个复合索引
+        Index("ix_org_parent_sort", "parent_id", "sort_order"),
+        # 列表中按负责人外连接人员表
+        Index("ix_org_leader_id", "leader_id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True, title="ID")
     name: str = Field(max_length=200, index=True, title="组织名称")
@@ -70,6 +76,43 @@ class Organization(SQLModel, table=True):
     )
 
 
+# 组织层级由PostgreSQL触发器维护：插入或修改上级时按上级层级+1计算，层级变化后逐级更新下级组织
+ORGANIZATION_LEVEL_TRIGGER_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION set_org_level() RETURNS trigger AS $$
+    BEGIN
+        NEW.level := COALESCE((SELECT level FROM organizations WHERE id = NEW.parent_id), 0) + 1;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_org_set_level ON organizations",
+    """
+    CREATE TRIGGER trg_org_set_level
+    BEFORE INSERT OR UPDATE OF parent_id, level ON organizations
+    FOR EACH ROW EXECUTE FUNCTION set_org_level()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION cascade_org_level() RETURNS trigger AS $$
+    BEGIN
+        UPDATE organizations SET level = NEW.level + 1 WHERE parent_id = NEW.id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_org_cascade_level ON organizations",
+    """
+    CREATE TRIGGER trg_org_cascade_level
+    AFTER UPDATE OF parent_id, level ON organizations
+    FOR EACH ROW WHEN (NEW.level IS DISTINCT FROM OLD.level)
+    EXECUTE FUNCTION cascade_org_level()
+    """,
+]
+
+for _statement in ORGANIZATION_LEVEL_TRIGGER_DDL:
+    event.listen(Organization.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+
 class OrganizationRole(SQLModel, table=True):
     __tablename__ = "organization_roles"
     
@@ -1,10 +1,13 @@
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import date, datetime
 
 
 class PersonImportItem(BaseModel):
     """人员导入项"""
+    # 字符串字段的首尾空白在校验长度和自定义校验之前统一去除
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
     name: str = Field(..., description="姓名", max_length=100)
     code: str = Field(..., description="人员编码", max_length=50)
     organization_id: Optional[int] = Field(None, description="所属组织ID")
@@ -30,52 +33,50 @@ class PersonImportItem(BaseModel):
     skills: Optional[str] = Field(None, description="技能", max_length=500)
     experience: Optional[str] = Field(None, description="工作经历", max_length=1000)
     
-    @validator('code')
+    @field_validator('code')
+    @classmethod
     def validate_code(cls, v):
-        if not v or not v.strip():
+        if not v:
             raise ValueError('人员编码不能为空')
-        return v.strip()
+        return v
     
-    @validator('name')
+    @field_validator('name')
+    @classmethod
     def validate_name(cls, v):
-        if not v or not v.strip():
+        if not v:
             raise ValueError('姓名不能为空')
-        return v.strip()
+        return v
     
-    @validator('phone')
+    @field_validator('phone')
+    @classmethod
     def validate_phone(cls, v):
-        if v and v.strip():
-            phone = v.strip()
-            if not phone.isdigit() or len(phone) != 11:
-                raise ValueError('手机号码必须是11位数字')
-            return phone
+        if v and (not v.isdigit() or len(v) != 11):
+            raise ValueError('手机号码必须是11位数字')
         return v
     
-    @validator('email')
+    @field_validator('email')
+    @classmethod
     def validate_email(cls, v):
-        if v and v.strip():
-            email = v.strip()
-            if '@' not in email:
-                raise ValueError('邮箱格式不正确')
-            return email
+        if v and '@' not in v:
+            raise ValueError('邮箱格式不正确')
         return v
     
-    @validator('id_card')
+    @field_validator('id_card')
+    @classmethod
     def validate_id_card(cls, v):
-        if v and v.strip():
-            id_card = v.strip()
-            if len(id_card) not in [15, 18]:
-                raise ValueError('身份证号必须是15位或18位')
-            return id_card
+        if v and len(v) not in [15, 18]:
+            raise ValueError('身份证号必须是15位或18位')
         return v
     
-    @validator('gender')
+    @field_validator('gender')
+    @classmethod
     def validate_gender(cls, v):
         if v and v not in ['male', 'female', 'other']:
             raise ValueError('性别必须是 male, female 或 other')
         return v
     
-    @validator('employment_status')
+    @field_validator('employment_status')
+    @classmethod
     def validate_employment_status(cls, v):
         if v and v not in ['active', 'probation', 'leave', 'retired', 'resigned']:
             raise ValueError('在职状态必须是 active, probation, leave, retired 或 resigned')
@@ -88,7 +89,8 @@ class PersonBatchImportRequest(BaseModel):
     import_mode: str = Field("append", description="导入模式: append(追加), update(更新), skip(跳过)")
     skip_duplicates: bool = Field(True, description="是否跳过重复数据")
     
-    @validator('import_mode')
+    @field_validator('import_mode')
+    @classmethod
     def validate_import_mode(cls, v):
         if v not in ['append', 'update', 'skip']:
             raise ValueError('导入模式必须是 append, update 或 skip')
@@ -104,24 +106,23 @@ class PersonBatchImportResult(BaseModel):
     success_rate: float = Field(..., description="成功率")
     errors: List[Dict[str, Any]] = Field(default_factory=list, description="错误列表")
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "total_count": 100,
-                "success_count": 95,
-                "failed_count": 3,
-                "skipped_count": 2,
-                "success_rate": 95.0,
-                "errors": [
-                    {
-                        "row_index": 5,
-                        "field": "phone",
-                        "error_message": "手机号码必须是11位数字",
-                        "data": {"name": "张三", "phone": "123"}
-                    }
-                ]
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "total_count": 100,
+            "success_count": 95,
+            "failed_count": 3,
+            "skipped_count": 2,
+            "success_rate": 95.0,
+            "errors": [
+                {
+                    "row_index": 5,
+                    "field": "phone",
+                    "error_message": "手机号码必须是11位数字",
+                    "data": {"name": "张三", "phone": "123"}
+                }
+            ]
         }
+    })
 
 
 class PersonImportError(BaseModel):
@@ -1,5 +1,5 @@
 from typing import List, Dict, Any, Optional
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, insert, update, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import logging
@@ -10,6 +10,12 @@ from app.organization.schemas.person_import import PersonImportItem, PersonBatch
 
 logger = logging.getLogger(__name__)
 
+# 每条INSERT/UPDATE语句批量写入的行数
+IMPORT_BATCH_SIZE = 500
+
+# 按人员编码批量更新现有记录，各行的列值作为executemany参数传入
+UPDATE_BY_CODE = update(Person).where(Person.code == bindparam("b_code"))
+
 
 class PersonImportService:
     """人员批量导入服务"""
@@ -40,35 +46,54 @@ class PersonImportService:
         skipped_count = 0
         errors = []
         
+        # 待新增的记录：人员编码 -> (行号, 导入项, 插入的列值)，最后在同一个事务中批量插入
+        pending: Dict[str, tuple] = {}
+        # 待更新的现有记录：人员编码 -> (行号, 导入项, 更新的列值)，与新增记录一起批量写入
+        updated: Dict[str, tuple] = {}
+        
+        # 一次查询取得本次导入涉及的已有人员编码和组织ID，循环中只做内存查找
+        codes = {item.code for item in data}
+        existing_codes = set(
+            (await self.db.scalars(select(Person.code).where(Person.code.in_(codes)))).all()
+        ) if codes else set()
+        organization_ids = {item.organization_id for item in data if item.organization_id}
+        existing_organization_ids = set(
+            (await self.db.scalars(select(Organization.id).where(Organization.id.in_(organization_ids)))).all()
+        ) if organization_ids else set()
+        
         for index, item in enumerate(data, start=1):
             try:
-                # 验证数据
-                validated_item = PersonImportItem(**item.dict())
+                # 先验证组织是否存在：更新和新增的行都在同一个事务中写入，
+                # 一行的外键错误会使整个事务回滚，需要在写入前单独记为失败
+                if item.organization_id and item.organization_id not in existing_organization_ids:
+                    raise ValueError(f"组织ID {item.organization_id} 不存在")
                 
-                # 检查是否重复
-                existing_person = await self._get_person_by_code(validated_item.code)
+                # 检查是否重复（包括本次导入中前面待新增的记录）
+                is_pending = item.code in pending
                 
-                if existing_person:
+                if is_pending or item.code in existing_codes:
                     if import_mode == "skip":
                         skipped_count += 1
                         continue
                     elif import_mode == "update":
                         # 更新现有记录
-                        await self._update_person(existing_person, validated_item)
+                        if is_pending:
+                            pending[item.code] = (index, item, self._person_values(item))
+                        else:
+                            updated[item.code] = (index, item, self._update_values(item))
                         success_count += 1
                         continue
                     elif skip_duplicates:
                         skipped_count += 1
                         continue
+                    elif is_pending:
+                        raise ValueError(f"人员编码 {item.code} 在导入数据中重复")
+                    else:
+                        # 已存在的编码再插入会违反唯一约束并使整个事务回滚
+                        raise ValueError(f"人员编码 {item.code} 已存在")
                 
-                # 验证组织是否存在
-                if validated_item.organization_id:
-                    org = await self._get_organization(validated_item.organization_id)
-                    if not org:
-                        raise ValueError(f"组织ID {validated_item.organization_id} 不存在")
-                
-                # 创建新人员记录
-                await self._create_person(validated_item)
+                # 记录待新增的人员，稍后批量插入
+                pending[item.code] = (index, item, self._person_values(item))
                 success_count += 1
                 
             except Exception as e:
@@ -80,7 +105,38 @@ class PersonImportService:
                     "row_index": index,
                     "field": self._extract_error_field(error_msg),
                     "error_message": error_msg,
-                    "data": item.dict()
+                    "data": item.model_dump()
+                })
+        
+        # 新增记录按批次多行插入，更新按批次executemany，在同一个事务中提交
+        try:
+            rows = [values for _, _, values in pending.values()]
+            for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+                await self.db.execute(insert(Person), rows[start:start + IMPORT_BATCH_SIZE])
+            update_rows = [values for _, _, values in updated.values()]
+            if update_rows:
+                # 自定义WHERE条件的批量更新走Core连接执行（ORM会话只支持按主键批量更新）
+                connection = await self.db.connection()
+                for start in range(0, len(update_rows), IMPORT_BATCH_SIZE):
+                    await connection.execute(UPDATE_BY_CODE, update_rows[start:start + IMPORT_BATCH_SIZE])
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            error_msg = str(e)
+            logger.error(f"批量写入人员数据失败: {error_msg}")
+            # 事务整体回滚，本次所有新增和更新都未生效
+            written = sorted(
+                [(index, item) for index, item, _ in [*pending.values(), *updated.values()]],
+                key=lambda entry: entry[0]
+            )
+            success_count -= len(written)
+            failed_count += len(written)
+            for index, item in written:
+                errors.append({
+                    "row_index": index,
+                    "field": self._extract_error_field(error_msg),
+                    "error_message": error_msg,
+                    "data": item.model_dump()
                 })
         
         # 计算成功率
@@ -95,84 +151,42 @@ class PersonImportService:
             errors=errors
         )
     
-    async def _get_person_by_code(self, code: str) -> Optional[Person]:
-        """根据编码获取人员"""
-        result = await self.db.execute(
-            select(Person).where(Person.code == code)
-        )
-        return result.scalar_one_or_none()
-    
-    async def _get_organization(self, org_id: int) -> Optional[Organization]:
-        """获取组织"""
-        result = await self.db.execute(
-            select(Organization).where(Organization.id == org_id)
-        )
-        return result.scalar_one_or_none()
-    
-    async def _create_person(self, item: PersonImportItem) -> Person:
-        """创建人员记录"""
-        person = Person(
-            name=item.name,
-            code=item.code,
-            organization_id=item.organization_id,
-            position=item.position,
-            job_level=item.job_level,
-            gender=item.gender,
-            birth_date=self._parse_date(item.birth_date),
-            id_card=item.id_card,
-            phone=item.phone,
-            email=item.email,
-            address=item.address,
-            emergency_contact=item.emergency_contact,
-            emergency_phone=item.emergency_phone,
-            hire_date=self._parse_date(item.hire_date),
-            probation_end_date=self._parse_date(item.probation_end_date),
-            contract_start_date=self._parse_date(item.contract_start_date),
-            contract_end_date=self._parse_date(item.contract_end_date),
-            employment_status=item.employment_status or "active",
-            work_location=item.work_location,
-            education=item.education,
-            major=item.major,
-            school=item.school,
-            skills=item.skills,
-            experience=item.experience,
-            is_active=True
-        )
-        
-        self.db.add(person)
-        await self.db.commit()
-        await self.db.refresh(person)
-        
-        return person
+    def _person_values(self, item: PersonImportItem) -> Dict[str, Any]:
+        """构造新增人员记录的列值"""
+        return {
+            "name": item.name,
+            "code": item.code,
+            "organization_id": item.organization_id,
+            "position": item.position,
+            "job_level": item.job_level,
+            "gender": item.gender,
+            "birth_date": self._parse_date(item.birth_date),
+            "id_card": item.id_card,
+            "phone": item.phone,
+            "email": item.email,
+            "address": item.address,
+            "emergency_contact": item.emergency_contact,
+            "emergency_phone": item.emergency_phone,
+            "hire_date": self._parse_date(item.hire_date),
+            "probation_end_date": self._parse_date(item.probation_end_date),
+            "contract_start_date": self._parse_date(item.contract_start_date),
+            "contract_end_date": self._parse_date(item.contract_end_date),
+            "employment_status": item.employment_status or "active",
+            "work_location": item.work_location,
+            "education": item.education,
+            "major": item.major,
+            "school": item.school,
+            "skills": item.skills,
+            "experience": item.experience,
+            "is_active": True,
+        }
     
-    async def _update_person(self, person: Person, item: PersonImportItem):
-        """更新人员记录"""
-        person.name = item.name
-        person.organization_id = item.organization_id
-        person.position = item.position
-        person.job_level = item.job_level
-        person.gender = item.gender
-        person.birth_date = self._parse_date(item.birth_date)
-        person.id_card = item.id_card
-        person.phone = item.phone
-        person.email = item.email
-        person.address = item.address
-        person.emergency_contact = item.emergency_contact
-        person.emergency_phone = item.emergency_phone
-        person.hire_date = self._parse_date(item.hire_date)
-        person.probation_end_date = self._parse_date(item.probation_end_date)
-        person.contract_start_date = self._parse_date(item.contract_start_date)
-        person.contract_end_date = self._parse_date(item.contract_end_date)
-        person.employment_status = item.employment_status or "active"
-        person.work_location = item.work_location
-        person.education = item.education
-        person.major = item.major
-        person.school = item.school
-        person.skills = item.skills
-        person.experience = item.experience
-        person.updated_at = datetime.now()
-        
-        await self.db.commit()
+    def _update_values(self, item: PersonImportItem) -> Dict[str, Any]:
+        """构造更新现有人员记录的列值，b_code为匹配记录的人员编码（updated_at由列的onupdate自动更新）"""
+        values = self._person_values(item)
+        del values["is_active"]
+        values["b_code"] = values.pop("code")
+        return values
     
     def _parse_date(self, date_str: Optional[str]) -> Optional[datetime]:
         """解析日期字符串"""
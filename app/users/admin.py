@@ -30,12 +30,8 @@ from ..core.config import settings
 
 async def get_user_from_request(request: Request) -> Optional[dict]:
     """从请求中获取当前用户信息"""
-    try:
-        if hasattr(request.state, 'user') and request.state.user:
-            return request.state.user
-        return None
-    except:
-        return None
+    user = getattr(request.state, 'user', None)
+    return user if user else None
 
 
 class UserAdmin(ClipboardCopyMixin, admin.ModelAdmin):
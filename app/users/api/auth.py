@@ -16,7 +16,10 @@ from ...core.auth import (
     get_client_info,
     check_login_attempts,
     validate_password_strength,
-    get_current_active_user
+    get_current_active_user,
+    invalidate_auth_cache,
+    JWT_KEY,
+    JWT_ALGORITHMS
 )
 from ...core.config import settings
 from .schemas import (
@@ -210,7 +213,7 @@ async def login(
     
     # 添加用户到在线列表
     from ...core.online_users import online_user_manager
-    online_user_manager.add_online_user(user_dict["id"], ip_address, user_agent)
+    await online_user_manager.add_online_user(user_dict["id"], ip_address, user_agent)
     
     return LoginResponse(
         access_token=access_token,
@@ -256,7 +259,10 @@ async def logout(
         await record_logout_history(db, current_user["id"])
         
         # 从在线用户列表中移除
-        online_user_manager.remove_online_user(current_user["id"])
+        await online_user_manager.remove_online_user(current_user["id"])
+        
+        # 清除该用户的登录认证缓存
+        invalidate_auth_cache(current_user["username"])
     except:
         pass
     
@@ -272,8 +278,8 @@ async def refresh_token(
     try:
         payload = jwt.decode(
             refresh_data.refresh_token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
+            JWT_KEY,
+            algorithms=JWT_ALGORITHMS
         )
     except JWTError:
         raise HTTPException(status_code=401, detail="无效的刷新令牌")
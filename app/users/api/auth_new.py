@@ -210,7 +210,7 @@ async def login(
     
     # 添加用户到在线列表
     from ...core.online_users import online_user_manager
-    online_user_manager.add_online_user(user_dict["id"], ip_address, user_agent)
+    await online_user_manager.add_online_user(user_dict["id"], ip_address, user_agent)
     
     return LoginResponse(
         access_token=access_token,
@@ -256,7 +256,7 @@ async def logout(
         await record_logout_history(db, current_user["id"])
         
         # 从在线用户列表中移除
-        online_user_manager.remove_online_user(current_user["id"])
+        await online_user_manager.remove_online_user(current_user["id"])
     except:
         pass
     
@@ -1,8 +1,9 @@
 from sqlmodel import SQLModel, Field, Relationship
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
 from sqlalchemy.sql import func
-from typing import Optional, List
+from typing import Optional, List, FrozenSet
 from datetime import datetime
+from functools import cached_property
 
 
 class UserRoleLink(SQLModel, table=True):
@@ -109,6 +110,15 @@ class User(SQLModel, table=True):
             "primaryjoin": "User.manager_id == remote(User.id)"
         }
     )
+    
+    @cached_property
+    def permission_codes(self) -> FrozenSet[str]:
+        """用户有效角色下的全部权限代码（每个用户对象只计算一次）"""
+        return frozenset(
+            permission.codename
+            for role in self.roles if role.is_active
+            for permission in role.permissions
+        )
 
 
 class Role(SQLModel, table=True):
@@ -9,15 +9,22 @@ from PIL import Image, ImageDraw, ImageFont
 import io
 import base64
 import hashlib
+import hmac
 
 from ..core.config import settings
 from ..core.logging import logger
 
 
+def hash_captcha_key(captcha_key: str) -> bytes:
+    """验证码密钥的摘要，存储和日志中只使用摘要，不使用原始密钥"""
+    return hashlib.blake2b(captcha_key.encode("utf-8"), digest_size=16).digest()
+
+
 class CaptchaManager:
     """验证码管理器"""
     
     def __init__(self):
+        # 验证码存储：密钥摘要 -> {'code': 验证码, 'expire_time': 过期时间}
         self.captcha_store = {}
     
     def generate_captcha_key(self) -> str:
@@ -155,15 +162,12 @@ class CaptchaManager:
         
         # 存储验证码
         expire_time = datetime.utcnow() + timedelta(seconds=settings.CAPTCHA_EXPIRE_SECONDS)
-        self.captcha_store[captcha_key] = {
+        self.captcha_store[hash_captcha_key(captcha_key)] = {
             'code': captcha_code,
             'expire_time': expire_time
         }
         
-        # 清理过期验证码
-        self.clean_expired_captchas()
-        
-        logger.info(f"创建验证码: key={captcha_key}, code={captcha_code}, 使用在线图片")
+        logger.info(f"创建验证码: key={hash_captcha_key(captcha_key).hex()[:8]}, code={captcha_code}, 使用在线图片")
         
         return captcha_key, captcha_image, captcha_code
     
@@ -173,26 +177,26 @@ class CaptchaManager:
         
         返回: 是否验证成功
         """
-        if captcha_key not in self.captcha_store:
+        store_key = hash_captcha_key(captcha_key)
+        captcha_data = self.captcha_store.get(store_key)
+        if captcha_data is None:
             return False
         
-        captcha_data = self.captcha_store[captcha_key]
-        
         # 检查是否过期
         if datetime.utcnow() > captcha_data['expire_time']:
-            del self.captcha_store[captcha_key]
+            del self.captcha_store[store_key]
             return False
         
-        # 验证码（不区分大小写）
-        if captcha_data['code'].lower() == captcha_code.lower():
+        # 验证码（不区分大小写，使用常量时间比较）
+        if hmac.compare_digest(captcha_data['code'].lower().encode("utf-8"), captcha_code.lower().encode("utf-8")):
             # 验证成功后删除验证码
-            del self.captcha_store[captcha_key]
+            del self.captcha_store[store_key]
             return True
         
         return False
     
-    def clean_expired_captchas(self):
-        """清理过期验证码"""
+    def clean_expired_captchas(self) -> int:
+        """清理过期验证码，返回清理的数量（由后台任务定期调用）"""
         current_time = datetime.utcnow()
         expired_keys = [
             key for key, value in self.captcha_store.items()
@@ -201,6 +205,7 @@ class CaptchaManager:
         
         for key in expired_keys:
             del self.captcha_store[key]
+        return len(expired_keys)
 
 
 # 全局验证码管理器实例
@@ -215,7 +220,7 @@ async def create_captcha() -> dict:
     """
     captcha_key, captcha_image, captcha_code = captcha_manager.create_captcha()
     
-    logger.info(f"创建验证码: key={captcha_key}, code={captcha_code}")
+    logger.info(f"创建验证码: key={hash_captcha_key(captcha_key).hex()[:8]}, code={captcha_code}")
     
     return {
         "captcha_key": captcha_key,
@@ -231,9 +236,10 @@ async def verify_captcha(captcha_key: str, captcha_code: str) -> bool:
     """
     result = captcha_manager.verify_captcha(captcha_key, captcha_code)
     
+    log_key = hash_captcha_key(captcha_key).hex()[:8]
     if result:
-        logger.info(f"验证码验证成功: key={captcha_key}")
+        logger.info(f"验证码验证成功: key={log_key}")
     else:
-        logger.warning(f"验证码验证失败: key={captcha_key}")
+        logger.warning(f"验证码验证失败: key={log_key}")
     
     return result
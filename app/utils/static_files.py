@@ -1,9 +1,22 @@
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
 import os
 import re
 
+# 文件名中带内容哈希的资源（如 index.3f2a9c1b.js、chunk-5e8d7a6f4b.css），内容变化时文件名也会变化。
+# 哈希段须同时含有a-f字母和数字，纯数字的日期、版本号（如 report-20240101.css、build-12345678.js）不算哈希
+HASHED_ASSET_PATTERN = re.compile(r"[.-](?=[0-9]*[a-fA-F])(?=[a-fA-F]*[0-9])[0-9a-fA-F]{8,}\.[A-Za-z0-9]+$")
+
+# 带哈希的资源长期缓存且不再校验
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 其他资源每次使用前向服务器校验，未修改时由ETag/Last-Modified返回304
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
 class AmisStaticFiles(StaticFiles):
     """自定义Amis静态文件处理器，用于正确映射资源文件路径"""
     
@@ -28,4 +41,33 @@ class AmisStaticFiles(StaticFiles):
                     return await RedirectResponse(url=new_path).scope, receive, send
         
         # 如果不是Amis资源或文件不存在，使用默认处理
-        return await super().__call__(scope, receive, send)
\ No newline at end of file
+        return await super().__call__(scope, receive, send)
+
+
+class CachedStaticFiles(StaticFiles):
+    """带缓存控制的静态文件处理器
+
+    为响应添加Cache-Control头：文件名带内容哈希的资源设置为一年且immutable，
+    其他资源要求浏览器校验，配合StaticFiles自带的ETag/Last-Modified返回304。
+    """
+
+    def file_response(
+        self,
+        full_path: "os.PathLike[str]",
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, method=scope["method"])
+        response.headers["Cache-Control"] = self.cache_control(str(full_path))
+        # 304响应会保留Cache-Control与ETag头
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    @staticmethod
+    def cache_control(path: str) -> str:
+        """根据文件名返回Cache-Control头的值"""
+        if HASHED_ASSET_PATTERN.search(os.path.basename(path)):
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
@@ -0,0 +1,57 @@
+"""
+数据库迁移脚本：为组织表添加索引
+为已有数据库补建 Organization 模型中声明的索引（新建的数据库由 create_all 自动创建）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+
+def run_migration():
+    """执行数据库迁移"""
+    
+    # 从settings获取数据库URL
+    from app.core.config import settings
+    
+    # 创建数据库引擎
+    engine = create_engine(settings.DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    
+    try:
+        print("开始执行数据库迁移...")
+        print("为 organizations 表创建索引...")
+        
+        index_statements = [
+            "CREATE INDEX IF NOT EXISTS ix_org_parent_sort ON organizations(parent_id, sort_order)",
+            "CREATE INDEX IF NOT EXISTS ix_org_leader_id ON organizations(leader_id)",
+        ]
+        
+        for stmt in index_statements:
+            try:
+                session.execute(text(stmt))
+                print(f"   索引创建成功: {stmt}")
+            except Exception as e:
+                if "already exists" in str(e):
+                    print(f"   索引已存在，跳过")
+                else:
+                    print(f"   索引创建失败: {e}")
+        
+        session.commit()
+        
+        print("\n数据库迁移完成!")
+        
+    except Exception as e:
+        session.rollback()
+        print(f"迁移失败: {e}")
+        raise
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,66 @@
+"""
+数据库迁移脚本：组织层级改由数据库触发器维护
+先用递归CTE按上级关系重新计算已有组织的层级，再创建 Organization 模型中声明的层级触发器
+（新建的数据库由 create_all 自动创建触发器）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+# 按上级关系从顶级组织逐级计算层级，只更新层级不一致的记录
+RECALCULATE_LEVEL_SQL = """
+WITH RECURSIVE tree AS (
+    SELECT id, 1 AS level FROM organizations WHERE parent_id IS NULL
+    UNION ALL
+    SELECT o.id, tree.level + 1 FROM organizations o JOIN tree ON o.parent_id = tree.id
+)
+UPDATE organizations SET level = tree.level
+FROM tree
+WHERE organizations.id = tree.id AND organizations.level IS DISTINCT FROM tree.level
+"""
+
+
+def run_migration():
+    """执行数据库迁移"""
+    
+    # 从settings获取数据库URL
+    from app.core.config import settings
+    from app.organization.models.organization import ORGANIZATION_LEVEL_TRIGGER_DDL
+    
+    # 创建数据库引擎
+    engine = create_engine(settings.DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    
+    try:
+        print("开始执行数据库迁移...")
+        
+        # 1. 在创建触发器之前重新计算已有组织的层级（避免更新时触发级联）
+        print("1. 重新计算已有组织的层级...")
+        result = session.execute(text(RECALCULATE_LEVEL_SQL))
+        print(f"   已更新 {result.rowcount} 条组织记录")
+        
+        # 2. 创建层级触发器
+        print("2. 创建组织层级触发器...")
+        for stmt in ORGANIZATION_LEVEL_TRIGGER_DDL:
+            session.execute(text(stmt))
+        print("   触发器创建完成")
+        
+        session.commit()
+        
+        print("\n数据库迁移完成!")
+        
+    except Exception as e:
+        session.rollback()
+        print(f"迁移失败: {e}")
+        raise
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    run_migration()
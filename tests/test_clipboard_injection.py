@@ -0,0 +1,103 @@
+"""
+剪贴板脚本注入中间件测试
+"""
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+from app.middleware.clipboard_injection import CLIPBOARD_SCRIPT, ClipboardScriptInjectionMiddleware
+
+SCRIPT = CLIPBOARD_SCRIPT.decode("utf-8")
+
+AMIS_PAGE = '<html><head><link href="/static/amis/sdk.css"/></head><body><div id="root"></div></body></html>'
+
+# 与admin页面模板一致：amis资源来自CDN，标记只出现在</head>之后的页面底部配置中
+CDN_PAGE = (
+    '<html><head><link href="https://unpkg.com/amis/sdk/sdk.css"/></head>'
+    '<body><script>amis.embed("#root", {"footer": "fastapi-amis-admin"});</script></body></html>'
+)
+
+
+def create_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(ClipboardScriptInjectionMiddleware)
+
+    @app.get("/admin", response_class=HTMLResponse)
+    async def admin_page():
+        return AMIS_PAGE
+
+    @app.get("/admin/stream")
+    async def admin_stream():
+        async def chunks():
+            yield b'<html><head><link href="/static/amis/sdk.css"/></he'
+            yield b'ad><body>'
+            yield b"<div>content</div></body></html>"
+
+        return StreamingResponse(chunks(), media_type="text/html")
+
+    @app.get("/admin/cdn", response_class=HTMLResponse)
+    async def admin_cdn_page():
+        return CDN_PAGE
+
+    @app.get("/admin/nohead", response_class=HTMLResponse)
+    async def admin_no_head():
+        return '<div class="amis-admin"></div></body>'
+
+    @app.get("/admin/plain", response_class=HTMLResponse)
+    async def plain_page():
+        return "<html><head></head><body>hello</body></html>"
+
+    @app.get("/admin/injected", response_class=HTMLResponse)
+    async def injected_page():
+        return '<html><head><script src="/static/js/clipboard-handler.js"></script>amis-page</head></html>'
+
+    @app.get("/admin/api")
+    async def api():
+        return JSONResponse({"html": AMIS_PAGE})
+
+    @app.get("/docs/page", response_class=HTMLResponse)
+    async def other_page():
+        return AMIS_PAGE
+
+    return TestClient(app)
+
+
+def test_inject_before_head_end():
+    response = create_client().get("/admin")
+    assert response.text == AMIS_PAGE.replace("</head>", SCRIPT + "</head>")
+    assert int(response.headers["content-length"]) == len(response.content)
+
+
+def test_inject_streaming_response_split_marker():
+    response = create_client().get("/admin/stream")
+    assert response.text == (
+        '<html><head><link href="/static/amis/sdk.css"/>' + SCRIPT + "</head><body><div>content</div></body></html>"
+    )
+
+
+def test_inject_when_marker_after_head_end():
+    response = create_client().get("/admin/cdn")
+    assert response.text == CDN_PAGE.replace("</head>", SCRIPT + "</head>")
+    assert int(response.headers["content-length"]) == len(response.content)
+
+
+def test_inject_before_body_end_without_head():
+    response = create_client().get("/admin/nohead")
+    assert response.text == '<div class="amis-admin"></div>' + SCRIPT + "</body>"
+
+
+def test_skip_non_amis_and_already_injected_pages():
+    client = create_client()
+    assert client.get("/admin/plain").text == "<html><head></head><body>hello</body></html>"
+    response = client.get("/admin/injected")
+    assert response.text.count("clipboard-handler.js") == 1
+
+
+def test_skip_non_html_response():
+    response = create_client().get("/admin/api")
+    assert response.json() == {"html": AMIS_PAGE}
+
+
+def test_skip_non_page_path():
+    response = create_client().get("/docs/page")
+    assert response.text == AMIS_PAGE
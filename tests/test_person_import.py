@@ -1,16 +1,61 @@
 import pytest
 import asyncio
-from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
 from datetime import datetime
 
+from app.users.models import User
+from app.projects.models.project import ProjectTask  # noqa: F401  User.assigned_tasks 关系引用
+from app.organization.models.organization import Organization
 from app.organization.models.person import Person
 from app.organization.schemas.person_import import PersonImportItem, PersonBatchImportRequest
-from app.organization.services.person_import_service import PersonImportService
+from app.organization.services.person_import_service import IMPORT_BATCH_SIZE, PersonImportService
+from app.api.batch_import import _import_persons
+
+# 导入涉及的数据表（persons 依赖 auth_user 和 organizations 的外键）
+IMPORT_TABLES = [User.__table__, Organization.__table__, Person.__table__]
+
+
+@pytest.fixture
+async def db_engine():
+    """内存SQLite引擎，每个测试独立建表"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all, tables=IMPORT_TABLES)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db_session(db_engine) -> AsyncSession:
+    """数据库会话，预置ID为1的组织"""
+    async with AsyncSession(db_engine, expire_on_commit=False) as session:
+        session.add(Organization(id=1, name="测试组织", code="ORG001", type="company"))
+        await session.commit()
+        yield session
+
+
+@pytest.fixture
+def executed_statements(db_engine):
+    """记录执行的SQL语句类型（INSERT/UPDATE/SELECT）"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+async def count_persons(db_session: AsyncSession) -> int:
+    return await db_session.scalar(select(func.count()).select_from(Person))
 
 
 class TestPersonImportService:
     """人员导入服务测试"""
-    
+
     @pytest.mark.asyncio
     async def test_import_persons_success(self, db_session: AsyncSession):
         """测试成功导入人员"""
@@ -31,7 +76,7 @@ class TestPersonImportService:
                 phone="13800138002"
             )
         ]
-        
+
         # 执行导入
         service = PersonImportService(db_session)
         result = await service.import_persons(
@@ -39,39 +84,49 @@ class TestPersonImportService:
             import_mode="append",
             skip_duplicates=True
         )
-        
+
         # 验证结果
         assert result.total_count == 2
         assert result.success_count == 2
         assert result.failed_count == 0
         assert result.success_rate == 100.0
-    
+
+        # 验证数据已写入
+        persons = (await db_session.scalars(select(Person).order_by(Person.code))).all()
+        assert [(p.code, p.name, p.organization_id, p.is_active) for p in persons] == [
+            ("TEST001", "测试用户1", 1, True),
+            ("TEST002", "测试用户2", 1, True),
+        ]
+
     @pytest.mark.asyncio
     async def test_import_persons_validation_error(self, db_session: AsyncSession):
         """测试数据验证失败"""
-        # 准备无效数据
-        import_data = [
+        # 姓名为空、手机号格式不正确的数据在构造导入项时即被拒绝
+        with pytest.raises(ValidationError) as exc_info:
             PersonImportItem(
                 name="",  # 姓名不能为空
                 code="TEST003",
                 phone="123"  # 手机号格式不正确
             )
+        assert {error["loc"][0] for error in exc_info.value.errors()} == {"name", "phone"}
+
+    @pytest.mark.asyncio
+    async def test_import_persons_organization_not_found(self, db_session: AsyncSession):
+        """测试所属组织不存在"""
+        import_data = [
+            PersonImportItem(name="测试用户", code="TEST004", organization_id=99),
+            PersonImportItem(name="测试用户", code="TEST005", organization_id=1),
         ]
-        
-        # 执行导入
+
         service = PersonImportService(db_session)
-        result = await service.import_persons(
-            data=import_data,
-            import_mode="append",
-            skip_duplicates=True
-        )
-        
-        # 验证结果
-        assert result.total_count == 1
-        assert result.success_count == 0
+        result = await service.import_persons(data=import_data)
+
+        assert result.success_count == 1
         assert result.failed_count == 1
-        assert len(result.errors) == 1
-    
+        assert result.errors[0]["row_index"] == 1
+        assert result.errors[0]["field"] == "organization_id"
+        assert await count_persons(db_session) == 1
+
     @pytest.mark.asyncio
     async def test_import_persons_skip_duplicates(self, db_session: AsyncSession):
         """测试跳过重复数据"""
@@ -83,7 +138,7 @@ class TestPersonImportService:
         )
         db_session.add(person)
         await db_session.commit()
-        
+
         # 尝试导入重复数据
         import_data = [
             PersonImportItem(
@@ -92,7 +147,7 @@ class TestPersonImportService:
                 phone="13800138003"
             )
         ]
-        
+
         # 执行导入（跳过模式）
         service = PersonImportService(db_session)
         result = await service.import_persons(
@@ -100,12 +155,37 @@ class TestPersonImportService:
             import_mode="skip",
             skip_duplicates=True
         )
-        
+
         # 验证结果
         assert result.total_count == 1
         assert result.skipped_count == 1
         assert result.success_count == 0
-    
+
+    @pytest.mark.asyncio
+    async def test_import_persons_append_skip_existing(self, db_session: AsyncSession):
+        """测试追加模式跳过已存在的人员，只新增其余记录"""
+        db_session.add(Person(name="已有用户", code="EXIST001", position="原始职位"))
+        await db_session.commit()
+
+        import_data = [
+            PersonImportItem(name="已有用户", code="EXIST001", position="新职位"),
+            PersonImportItem(name="新用户", code="NEW001"),
+        ]
+
+        service = PersonImportService(db_session)
+        result = await service.import_persons(
+            data=import_data,
+            import_mode="append",
+            skip_duplicates=True
+        )
+
+        assert result.success_count == 1
+        assert result.skipped_count == 1
+        assert result.failed_count == 0
+        assert await count_persons(db_session) == 2
+        position = await db_session.scalar(select(Person.position).where(Person.code == "EXIST001"))
+        assert position == "原始职位"
+
     @pytest.mark.asyncio
     async def test_import_persons_update_mode(self, db_session: AsyncSession):
         """测试更新模式"""
@@ -118,7 +198,7 @@ class TestPersonImportService:
         )
         db_session.add(person)
         await db_session.commit()
-        
+
         # 导入更新数据
         import_data = [
             PersonImportItem(
@@ -128,7 +208,7 @@ class TestPersonImportService:
                 position="新职位"  # 更新职位
             )
         ]
-        
+
         # 执行导入（更新模式）
         service = PersonImportService(db_session)
         result = await service.import_persons(
@@ -136,15 +216,215 @@ class TestPersonImportService:
             import_mode="update",
             skip_duplicates=False
         )
-        
+
         # 验证结果
         assert result.total_count == 1
         assert result.success_count == 1
-        
+
         # 验证数据已更新
-        updated_person = await service._get_person_by_code("UPD001")
-        assert updated_person.phone == "13900139004"
-        assert updated_person.position == "新职位"
+        await db_session.refresh(person)
+        assert person.phone == "13900139004"
+        assert person.position == "新职位"
+
+    @pytest.mark.asyncio
+    async def test_import_persons_update_mode_mixed(self, db_session: AsyncSession):
+        """测试更新模式同时更新已有人员和新增人员"""
+        db_session.add(Person(name="已有用户", code="UPD002", position="原始职位", hire_date=datetime(2020, 1, 1)))
+        await db_session.commit()
+
+        import_data = [
+            PersonImportItem(name="已有用户", code="UPD002", position="新职位", hire_date="2021/02/03"),
+            PersonImportItem(name="新用户", code="UPD003", position="新职位"),
+        ]
+
+        service = PersonImportService(db_session)
+        result = await service.import_persons(data=import_data, import_mode="update")
+
+        assert result.success_count == 2
+        assert result.failed_count == 0
+        persons = (await db_session.scalars(select(Person).order_by(Person.code))).all()
+        assert [(p.code, p.position) for p in persons] == [("UPD002", "新职位"), ("UPD003", "新职位")]
+        assert str(persons[0].hire_date) == "2021-02-03"
+
+    @pytest.mark.asyncio
+    async def test_import_persons_duplicate_code_in_file(self, db_session: AsyncSession):
+        """测试同一文件中人员编码重复：默认跳过后出现的行"""
+        import_data = [
+            PersonImportItem(name="第一行", code="SAME001"),
+            PersonImportItem(name="第二行", code="SAME001"),
+        ]
+
+        service = PersonImportService(db_session)
+        result = await service.import_persons(data=import_data, import_mode="append", skip_duplicates=True)
+
+        assert result.success_count == 1
+        assert result.skipped_count == 1
+        assert await db_session.scalar(select(Person.name).where(Person.code == "SAME001")) == "第一行"
+
+    @pytest.mark.asyncio
+    async def test_import_persons_duplicate_code_in_file_not_skipped(self, db_session: AsyncSession):
+        """测试同一文件中人员编码重复且不跳过时，后出现的行记为失败"""
+        import_data = [
+            PersonImportItem(name="第一行", code="SAME002"),
+            PersonImportItem(name="第二行", code="SAME002"),
+        ]
+
+        service = PersonImportService(db_session)
+        result = await service.import_persons(data=import_data, import_mode="append", skip_duplicates=False)
+
+        assert result.success_count == 1
+        assert result.failed_count == 1
+        assert result.errors[0]["row_index"] == 2
+        assert result.errors[0]["field"] == "code"
+        assert await count_persons(db_session) == 1
+
+    @pytest.mark.asyncio
+    async def test_import_persons_duplicate_code_in_file_update_mode(self, db_session: AsyncSession):
+        """测试更新模式下同一文件中重复的人员编码以最后一行为准"""
+        import_data = [
+            PersonImportItem(name="第一行", code="SAME003"),
+            PersonImportItem(name="第二行", code="SAME003"),
+        ]
+
+        service = PersonImportService(db_session)
+        result = await service.import_persons(data=import_data, import_mode="update")
+
+        assert result.success_count == 2
+        assert await count_persons(db_session) == 1
+        assert await db_session.scalar(select(Person.name).where(Person.code == "SAME003")) == "第二行"
+
+    @pytest.mark.asyncio
+    async def test_import_persons_update_mode_organization_not_found(self, db_session: AsyncSession):
+        """测试更新模式下组织不存在的行单独失败，不影响其他行写入"""
+        db_session.add(Person(name="已有用户", code="ORGUPD001", organization_id=1))
+        await db_session.commit()
+
+        import_data = [
+            PersonImportItem(name="已有用户", code="ORGUPD001", organization_id=99),
+            PersonImportItem(name="新用户", code="ORGUPD002", organization_id=1),
+            PersonImportItem(name="新用户", code="ORGUPD002", organization_id=99),
+            PersonImportItem(name="另一用户", code="ORGUPD003", position="新职位"),
+        ]
+
+        service = PersonImportService(db_session)
+        result = await service.import_persons(data=import_data, import_mode="update")
+
+        assert result.success_count == 2
+        assert result.failed_count == 2
+        assert [error["row_index"] for error in result.errors] == [1, 3]
+        assert {error["field"] for error in result.errors} == {"organization_id"}
+        persons = (await db_session.scalars(select(Person).order_by(Person.code))).all()
+        assert [(p.code, p.organization_id) for p in persons] == [
+            ("ORGUPD001", 1),
+            ("ORGUPD002", 1),
+            ("ORGUPD003", None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_import_persons_existing_code_not_skipped(self, db_session: AsyncSession):
+        """测试追加模式不跳过重复时，已存在的编码单独失败"""
+        db_session.add(Person(name="已有用户", code="EXIST002"))
+        await db_session.commit()
+
+        import_data = [
+            PersonImportItem(name="已有用户", code="EXIST002"),
+            PersonImportItem(name="新用户", code="NEW002"),
+        ]
+
+        service = PersonImportService(db_session)
+        result = await service.import_persons(data=import_data, import_mode="append", skip_duplicates=False)
+
+        assert result.success_count == 1
+        assert result.failed_count == 1
+        assert result.errors[0]["row_index"] == 1
+        assert result.errors[0]["field"] == "code"
+        assert await count_persons(db_session) == 2
+
+    @pytest.mark.asyncio
+    async def test_import_persons_batch_boundary(self, db_session: AsyncSession, executed_statements):
+        """测试超过一个批次的数据分多条INSERT写入"""
+        import_data = [
+            PersonImportItem(name=f"用户{i}", code=f"BATCH{i:04d}", organization_id=1)
+            for i in range(IMPORT_BATCH_SIZE + 1)
+        ]
+
+        service = PersonImportService(db_session)
+        executed_statements.clear()
+        result = await service.import_persons(data=import_data)
+
+        assert result.success_count == IMPORT_BATCH_SIZE + 1
+        assert executed_statements.count("INSERT") == 2
+        assert await count_persons(db_session) == IMPORT_BATCH_SIZE + 1
+
+    @pytest.mark.asyncio
+    async def test_import_persons_rollback(self, db_session: AsyncSession, db_engine):
+        """测试批量写入失败时整体回滚，所有待写入的行计为失败"""
+        db_session.add(Person(name="已有用户", code="ROLL0000", position="原始职位"))
+        await db_session.commit()
+
+        import_data = [PersonImportItem(name="已有用户", code="ROLL0000", position="新职位")] + [
+            PersonImportItem(name=f"用户{i}", code=f"ROLL{i:04d}")
+            for i in range(1, IMPORT_BATCH_SIZE + 2)
+        ] + [PersonImportItem(name="无效组织", code="ROLLBAD", organization_id=99)]
+
+        inserts = []
+
+        def fail_second_insert(conn, cursor, statement, parameters, context, executemany):
+            # 第一批INSERT成功执行后，第二批INSERT失败
+            if statement.startswith("INSERT"):
+                inserts.append(statement)
+                if len(inserts) == 2:
+                    raise RuntimeError("模拟数据库写入失败")
+
+        event.listen(db_engine.sync_engine, "before_cursor_execute", fail_second_insert)
+        service = PersonImportService(db_session)
+        result = await service.import_persons(data=import_data, import_mode="update")
+        event.remove(db_engine.sync_engine, "before_cursor_execute", fail_second_insert)
+
+        assert result.total_count == len(import_data)
+        assert result.success_count == 0
+        assert result.failed_count == len(import_data)
+        assert result.success_rate == 0
+        # 组织不存在的行先记录错误，回滚的行按行号追加在后
+        assert result.errors[0]["row_index"] == len(import_data)
+        assert [error["row_index"] for error in result.errors[1:]] == list(range(1, len(import_data)))
+        assert result.errors[1]["error_message"] == "模拟数据库写入失败"
+
+        # 第一批已插入的记录和更新都已回滚
+        assert await count_persons(db_session) == 1
+        assert await db_session.scalar(select(Person.position).where(Person.code == "ROLL0000")) == "原始职位"
+
+
+
+class TestBatchImportPersonsApi:
+    """批量导入对话框提交的人员导入接口测试"""
+
+    @pytest.mark.asyncio
+    async def test_import_persons_from_excel(self, db_session: AsyncSession):
+        """测试按模板列顺序解析Excel并通过导入服务写入"""
+        import io
+        import openpyxl
+
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["表头"] * 24)
+        sheet.append(["张三", "P001", 1, "工程师", None, "男", datetime(1990, 1, 2), None, "123"] + [None] * 15)
+        sheet.append(["李四", "P002", 99] + [None] * 21)
+        sheet.append(["王五", "P003", None, None, None, None, None, None, None, "bad-email"] + [None] * 14)
+        sheet.append(["赵六", "P001"] + [None] * 22)
+        content = io.BytesIO()
+        workbook.save(content)
+
+        result = await _import_persons(content.getvalue(), "xlsx", db_session)
+
+        assert result["status"] == 0
+        assert result["data"]["success_count"] == 1
+        assert result["data"]["failed_count"] == 2
+        assert result["data"]["skipped_count"] == 1
+        person = await db_session.scalar(select(Person).where(Person.code == "P001"))
+        # 性别按中文映射，日期单元格只保留日期部分，格式不正确的手机号置空
+        assert (person.name, person.gender, str(person.birth_date), person.phone) == ("张三", "male", "1990-01-02", None)
+        assert await count_persons(db_session) == 1
 
 
 if __name__ == "__main__":
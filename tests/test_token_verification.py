@@ -0,0 +1,94 @@
+"""
+令牌验证脚本注入中间件测试
+"""
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+from app.middleware.token_verification import TokenVerificationMiddleware
+
+SCRIPT = TokenVerificationMiddleware.TOKEN_SCRIPT_BYTES.decode("utf-8")
+
+PAGE = "<html><head></head><body><div id=\"root\"></div></body></html>"
+
+# 标记出现在页面前部，距离</body>超过查找范围（如页面内容中引用了函数名）
+FAR_MARKER_PAGE = (
+    "<html><head><script>// verifyAndSetToken</script></head><body>"
+    + "x" * TokenVerificationMiddleware.MARKER_SEARCH_WINDOW
+    + "</body></html>"
+)
+
+
+def create_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(TokenVerificationMiddleware)
+
+    @app.get("/admin", response_class=HTMLResponse)
+    async def admin_page():
+        return PAGE
+
+    @app.get("/admin/stream")
+    async def admin_stream():
+        async def chunks():
+            yield b"<html><body><div>content</div></bo"
+            yield b"dy></html>"
+
+        return StreamingResponse(chunks(), media_type="text/html")
+
+    @app.get("/admin/injected", response_class=HTMLResponse)
+    async def injected_page():
+        return "<html><body><script>window.verifyAndSetToken = null;</script></body></html>"
+
+    @app.get("/admin/far", response_class=HTMLResponse)
+    async def far_marker_page():
+        return FAR_MARKER_PAGE
+
+    @app.get("/admin/unclosed", response_class=HTMLResponse)
+    async def unclosed_page():
+        return "<div><script>window.verifyAndSetToken = null;</script>" + "x" * 10000
+
+    @app.get("/admin/api")
+    async def api():
+        return JSONResponse({"html": PAGE})
+
+    @app.get("/docs/page", response_class=HTMLResponse)
+    async def other_page():
+        return PAGE
+
+    return TestClient(app)
+
+
+def test_inject_before_body_end():
+    response = create_client().get("/admin")
+    assert response.text == PAGE.replace("</body>", SCRIPT + "</body>")
+    assert int(response.headers["content-length"]) == len(response.content)
+
+
+def test_inject_streaming_response():
+    response = create_client().get("/admin/stream")
+    assert response.text == "<html><body><div>content</div>" + SCRIPT + "</body></html>"
+
+
+def test_skip_page_with_token_script():
+    response = create_client().get("/admin/injected")
+    assert response.text.count("verifyAndSetToken") == 1
+
+
+def test_marker_outside_search_window():
+    response = create_client().get("/admin/far")
+    assert response.text == FAR_MARKER_PAGE.replace("</body>", SCRIPT + "</body>")
+
+
+def test_full_scan_without_closing_tag():
+    response = create_client().get("/admin/unclosed")
+    assert response.text.count("verifyAndSetToken") == 1
+
+
+def test_skip_non_html_response():
+    response = create_client().get("/admin/api")
+    assert response.json() == {"html": PAGE}
+
+
+def test_skip_non_admin_path():
+    response = create_client().get("/docs/page")
+    assert response.text == PAGE